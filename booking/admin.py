@@ -1,6 +1,61 @@
-from django.contrib import admin
-from .models import Theater, Show, Seat, Reservation, Ticket
-from .forms import TheaterCreationForm
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.forms.models import BaseInlineFormSet
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+from .models import Theater, Show, Seat, PriceZone, ShowPriceOverride, Reservation, Ticket
+from .forms import SeatLayoutImportForm, TheaterCreationForm
+from .layout_import import LayoutError, import_layout, read_layout
+from .services import cancel_reservations, pay_reservations
+
+# Unfiltered changelists of tables larger than this show PostgreSQL's row
+# estimate instead of running COUNT(*).
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) on filtered changelists.
+    show_full_result_count = False
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Shows one page of the related objects, chosen by the ``<prefix>-page``
+    query parameter, instead of all of them.
+    """
+    per_page = 50
+    request = None
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            queryset = super().get_queryset()
+            number = self.request.GET.get(f'{self.prefix}-page') if self.request is not None else None
+            self.page = Paginator(queryset, self.per_page).get_page(number)
+            self._queryset = self.page.object_list
+        return self._queryset
+
 
 class SeatInline(admin.TabularInline):
     model = Seat
@@ -9,49 +64,139 @@ class SeatInline(admin.TabularInline):
 
 class ReservationInline(admin.TabularInline):
     model = Reservation
+    formset = PaginatedInlineFormSet
+    template = 'admin/booking/paginated_tabular.html'
     extra = 0
-    readonly_fields = ('user', 'seat', 'id', 'reserved_at')
+    readonly_fields = ('user', 'seat', 'id', 'reserved_at', 'status')
+    # Reservations are made and cancelled through the services only.
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'show', 'seat__theater')
 
-class ShowAdmin(admin.ModelAdmin):
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.request = request
+        return formset
+
+class ShowPriceOverrideInline(admin.TabularInline):
+    model = ShowPriceOverride
+    extra = 0
+    raw_id_fields = ('zone',)
+
+class ShowAdmin(ScalableAdmin):
     list_display = ('theater', 'title', 'description', 'date', 'time')
-    search_fields = ('theater__name', 'title', 'date')
-    list_filter = ('theater__name', 'date', 'time')
-    inlines = [ ReservationInline]
+    list_select_related = ('theater',)
+    search_fields = ('theater__name', 'title')
+    list_filter = ('date',)
+    raw_id_fields = ('theater',)
+    inlines = [ShowPriceOverrideInline, ReservationInline]
 
-class TheaterAdmin(admin.ModelAdmin):
+class TheaterAdmin(ScalableAdmin):
     form = TheaterCreationForm
-    list_display = ('name', 'location', 'total_seats')
+    list_display = ('name', 'location', 'seat_count')
     search_fields = ('name', 'location')
-    list_filter = ('location',)
+    actions = ['import_seat_layout']
 
-    def total_seats(self, obj):
-        return obj.seat_set.count()
-    total_seats.short_description = 'Total Seats'
+    def get_queryset(self, request):
+        # A correlated subquery is evaluated only for the rows on the page,
+        # unlike a JOIN + GROUP BY over the whole seat table.
+        seat_count = (
+            Seat.objects.filter(theater=OuterRef('pk'))
+            .order_by()
+            .values('theater')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return super().get_queryset(request).annotate(seat_count=Coalesce(Subquery(seat_count), 0))
+
+    @admin.display(description='Total Seats', ordering='seat_count')
+    def seat_count(self, obj):
+        return obj.seat_count
 
     def save_model(self, request, obj, form, change):
-        obj.save()
-        num_seats = form.cleaned_data['num_seats']
+        super().save_model(request, obj, form, change)
         if not change:  # Only create seats if it's a new object
-            seats = [Seat(theater=obj, seat_number=i) for i in range(1, num_seats + 1)]
-            Seat.objects.bulk_create(seats)
+            form.create_seats(obj)
+
+    @admin.action(description='Import seat layout')
+    def import_seat_layout(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, 'Select exactly one theater to import a layout into.', messages.WARNING)
+            return None
+        theater = queryset.get()
+        form = SeatLayoutImportForm(request.POST if 'apply' in request.POST else None, request.FILES or None)
+        if form.is_valid():
+            upload = form.cleaned_data['layout']
+            try:
+                created = import_layout(theater, read_layout(upload, upload.name))
+            except LayoutError as error:
+                form.add_error('layout', str(error))
+            else:
+                self.message_user(request, f'Imported {created} seats into {theater.name}.', messages.SUCCESS)
+                return None
+        return TemplateResponse(request, 'admin/booking/import_seat_layout.html', {
+            **self.admin_site.each_context(request),
+            'title': f'Import seat layout into {theater.name}',
+            'opts': self.model._meta,
+            'theater': theater,
+            'form': form,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+class SeatAdmin(ScalableAdmin):
+    list_display = ('theater', 'seat_number', 'price_zone', 'is_reserved')
+    list_select_related = ('theater', 'price_zone__theater')
+    search_fields = ('theater__name', 'seat_number')
+    list_filter = ('is_reserved',)
+    raw_id_fields = ('theater', 'price_zone')
+
+class PriceZoneAdmin(ScalableAdmin):
+    list_display = ('theater', 'name', 'price')
+    list_select_related = ('theater',)
+    search_fields = ('theater__name', 'name')
+    raw_id_fields = ('theater',)
+
+class ReservationAdmin(ScalableAdmin):
+    list_display = ('user', 'show', 'seat', 'id', 'status', 'reserved_at')
+    list_select_related = ('user', 'show__theater', 'seat__theater')
+    search_fields = ('user__username', 'show__title', '=id')
+    list_filter = ('status', 'reserved_at')
+    readonly_fields = ('user', 'show', 'seat', 'status', 'reserved_at', 'expires_at')
+    actions = ['mark_paid', 'cancel']
+
+    # Reservations are made and their status changed through the services
+    # only, so seat availability and the show occupancy counters follow;
+    # the admin can pay or cancel them but not add, edit or delete them.
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
-class SeatAdmin(admin.ModelAdmin):
-    list_display = ('theater', 'seat_number', 'is_reserved')
-    search_fields = ('theater', 'seat_number')
-    list_filter = ('theater', 'is_reserved')
+    @admin.action(description='Mark selected reservations as paid')
+    def mark_paid(self, request, queryset):
+        changed = pay_reservations(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'Marked {changed} reservations as paid.', messages.SUCCESS)
 
-class ReservationAdmin(admin.ModelAdmin):
-    list_display = ('user', 'show', 'seat', 'id', 'reserved_at')
-    search_fields = ('user__username', 'show__title', 'id')
-    list_filter = ('show__title', 'user__username', 'reserved_at')
+    @admin.action(description='Cancel selected reservations')
+    def cancel(self, request, queryset):
+        changed = cancel_reservations(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'Cancelled {changed} reservations.', messages.SUCCESS)
 
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(ScalableAdmin):
     list_display = ('reservation', 'ticket_number', 'issued_at')
-    search_fields = ('reservation__id', 'ticket_number')
-    list_filter = ('reservation__show__title', 'issued_at')
+    list_select_related = ('reservation__user', 'reservation__show')
+    search_fields = ('=reservation__id', 'ticket_number')
+    list_filter = ('issued_at',)
+    raw_id_fields = ('reservation',)
 
 admin.site.register(Theater, TheaterAdmin)
 admin.site.register(Show, ShowAdmin)
 admin.site.register(Seat, SeatAdmin)
+admin.site.register(PriceZone, PriceZoneAdmin)
 admin.site.register(Reservation, ReservationAdmin)
 admin.site.register(Ticket, TicketAdmin)
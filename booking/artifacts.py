@@ -0,0 +1,137 @@
+"""
+Printable ticket artifacts.
+
+A ticket renders once, in a Celery task after it is issued, to an SVG with
+the show details and a QR code of the ticket number. Files are stored under
+``TICKET_ARTIFACT_ROOT`` by the SHA-256 of every printed field and
+``TEMPLATE_VERSION``, so downloads are served straight from disk, and a
+rescheduled show, a renamed theater or a changed template (once the version
+is bumped) renders the ticket afresh under a new name without touching the
+old one.
+"""
+import hashlib
+import os
+import tempfile
+
+import qrcode
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from .models import Ticket
+
+# Bump whenever booking/ticket.svg or the way it uses TICKET_FIELDS changes.
+TEMPLATE_VERSION = 1
+CONTENT_TYPE = 'image/svg+xml'
+# Seconds during which downloads of a missing artifact do not queue another render.
+RENDER_QUEUED_TIMEOUT = 30
+
+# Everything printed on a ticket, as ``Ticket`` lookups.
+TICKET_FIELDS = (
+    'ticket_number',
+    'reservation__show__title',
+    'reservation__show__date',
+    'reservation__show__time',
+    'reservation__show__theater__name',
+    'reservation__show__theater__location',
+    'reservation__seat__seat_number',
+    'reservation__user__username',
+    'reservation__user__first_name',
+    'reservation__user__last_name',
+)
+
+
+def load_ticket(**filters):
+    """
+    The ticket matching ``filters`` as a dict of its ``pk``, its holder's
+    ``reservation__user_id`` and ``TICKET_FIELDS``, or ``None``.
+    """
+    return Ticket.objects.filter(**filters).values('pk', 'reservation__user_id', *TICKET_FIELDS).first()
+
+
+def artifact_key(ticket):
+    printed = [str(ticket[field]) for field in TICKET_FIELDS]
+    return hashlib.sha256(repr((TEMPLATE_VERSION, printed)).encode()).hexdigest()
+
+
+def artifact_name(ticket):
+    """
+    Path of the artifact relative to ``TICKET_ARTIFACT_ROOT``, fanned out
+    over two directory levels.
+    """
+    key = artifact_key(ticket)
+    return os.path.join(key[:2], key[2:4], f'{key}.svg')
+
+
+def artifact_path(ticket):
+    return os.path.join(settings.TICKET_ARTIFACT_ROOT, artifact_name(ticket))
+
+
+def qr_path(data):
+    """
+    SVG path data drawing the QR code of ``data``, one unit per module, with
+    each horizontal run of dark modules as a single rectangle.
+    """
+    code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=0)
+    code.add_data(data)
+    code.make(fit=True)
+    matrix = code.get_matrix()
+    commands = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < len(row) and row[x]:
+                x += 1
+            commands.append(f'M{start} {y}h{x - start}v1h-{x - start}z')
+    return ''.join(commands), len(matrix)
+
+
+def render_ticket(ticket):
+    """
+    The SVG of ``ticket``, as returned by ``load_ticket``.
+    """
+    path, size = qr_path(ticket['ticket_number'])
+    full_name = f"{ticket['reservation__user__first_name']} {ticket['reservation__user__last_name']}".strip()
+    return render_to_string('booking/ticket.svg', {
+        'ticket_number': ticket['ticket_number'],
+        'show': {
+            'title': ticket['reservation__show__title'],
+            'date': ticket['reservation__show__date'],
+            'time': ticket['reservation__show__time'],
+        },
+        'theater': {
+            'name': ticket['reservation__show__theater__name'],
+            'location': ticket['reservation__show__theater__location'],
+        },
+        'seat_number': ticket['reservation__seat__seat_number'],
+        'holder': full_name or ticket['reservation__user__username'],
+        'qr_path': path,
+        'qr_size': size,
+    })
+
+
+def store_artifact(ticket):
+    """
+    Render ``ticket`` unless its artifact exists already and return the path.
+    The file is written beside its final name and renamed into place, so a
+    reader never sees a partial file and concurrent renders are harmless.
+    """
+    path = artifact_path(ticket)
+    if os.path.exists(path):
+        return path
+    content = render_ticket(ticket).encode()
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return path
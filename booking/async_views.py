@@ -0,0 +1,169 @@
+"""
+Async versions of the catalog listings, served in place of the DRF views by
+the ASGI application (``theatre_booking_system.asgi``).
+
+GET /api/theaters/, /api/shows/ and /api/seats/ answer exactly like
+TheaterListAPIView, ShowListAPIView and SeatListCreateAPIView: same JSON,
+keyset cursors, ETag/Last-Modified and NDJSON streaming. They await the
+async ORM and cache APIs instead of holding a worker thread for the whole
+request. Any other method is handed to the DRF view unchanged.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import BadRequest
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .availability import get_availability, theater_id_for_show
+from .cache import VersionedRead
+from .models import Seat, Show
+from .pagination import KeysetPagination
+from .renderers import accepts_ndjson, astream_ndjson
+from .serializers import TheaterListSerializer, ShowListSerializer, SeatListSerializer
+from .views import (
+    SEAT_FILTERS, SHOW_FILTERS, THEATER_FILTERS, TheaterListAPIView, ShowListAPIView, SeatListCreateAPIView,
+    list_params, parse_id, set_validators, show_listing, theater_listing,
+)
+
+jwt_authentication = JWTAuthentication()
+
+
+async def authenticate(request):
+    """
+    The active user named by the request's access token, or ``None``; the
+    same checks as ``JWTAuthentication`` with the user fetched asynchronously.
+    """
+    header = jwt_authentication.get_header(request)
+    raw_token = jwt_authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    try:
+        token = jwt_authentication.get_validated_token(raw_token)
+    except InvalidToken:
+        return None
+    user_id = token.get(jwt_settings.USER_ID_CLAIM)
+    if user_id is None:
+        return None
+    user = await get_user_model().objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+    if user is None or not user.is_active:
+        return None
+    return user
+
+
+def json_response(data, status=200):
+    # Rendered by DRF so the bytes match the synchronous views.
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def unauthorized():
+    response = json_response({'detail': 'Authentication credentials were not provided.'}, status=401)
+    response['WWW-Authenticate'] = jwt_authentication.authenticate_header(None)
+    return response
+
+
+def message(text, status):
+    return json_response({'message': text}, status=status)
+
+
+async def alist_response(request, queryset, serializer_class, dependencies, filters=(), transform=None,
+                         empty_message=None):
+    """
+    ``views.list_response`` for async views. ``transform`` is a coroutine
+    function that receives each page (or NDJSON chunk) of serialized rows.
+    """
+    if accepts_ndjson(request):
+        return astream_ndjson(queryset, serializer_class, transform=transform)
+
+    # Always rendered as JSON, like the default renderer of the sync views.
+    read = await VersionedRead.acreate(dependencies, list_params(request, filters, JSONRenderer.format))
+    not_modified = get_conditional_response(request, etag=read.etag, last_modified=read.last_modified)
+    if not_modified is not None:
+        return set_validators(not_modified, read)
+
+    async def paginate():
+        paginator = KeysetPagination(value_getter=serializer_class.cursor_value)
+        page_queryset = paginator.page_queryset(serializer_class.prepare_queryset(queryset), request)
+        page = paginator.set_page([row async for row in page_queryset])
+        return {'next': paginator.get_next_cursor(), 'results': serializer_class(page, many=True).data}
+
+    try:
+        page = await read.aget_or_set(paginate)
+    except NotFound as error:
+        return json_response({'detail': str(error.detail)}, status=404)
+    if empty_message and not page['results'] and 'cursor' not in request.GET:
+        return message(empty_message, 404)
+    if transform is not None:
+        await transform(page['results'])
+    payload = {'next': KeysetPagination.link_to(request, page['next']), 'results': page['results']}
+    return set_validators(json_response(payload), read)
+
+
+def async_list_view(fallback_view):
+    """
+    Turn ``list_view(request)`` into an async view for the URL of the DRF
+    ``fallback_view``, which still answers every method but GET.
+    """
+    fallback = sync_to_async(fallback_view.as_view())
+
+    def decorator(list_view):
+        @csrf_exempt
+        @transaction.non_atomic_requests
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await fallback(request, *args, **kwargs)
+            if await authenticate(request) is None:
+                return unauthorized()
+            return await list_view(request)
+
+        view.__name__ = view.__qualname__ = list_view.__name__
+        return view
+
+    return decorator
+
+
+@async_list_view(TheaterListAPIView)
+async def theater_list(request):
+    try:
+        theaters, dependencies = theater_listing(request.GET)
+    except BadRequest as error:
+        return message(str(error), 400)
+    return await alist_response(request, theaters, TheaterListSerializer, dependencies, filters=THEATER_FILTERS,
+                                empty_message='No theaters found')
+
+
+@async_list_view(ShowListAPIView)
+async def show_list(request):
+    try:
+        shows, dependencies = show_listing(request.GET)
+    except BadRequest as error:
+        return message(str(error), 400)
+    return await alist_response(request, shows, ShowListSerializer, dependencies, filters=SHOW_FILTERS)
+
+
+@async_list_view(SeatListCreateAPIView)
+async def seat_list(request):
+    show_id = request.GET.get('show_id')
+    if not show_id:
+        return await alist_response(request, Seat.objects.all(), SeatListSerializer, [('seat', None)])
+    show_id = parse_id(show_id)
+    try:
+        theater_id = await sync_to_async(theater_id_for_show)(show_id)
+    except Show.DoesNotExist:
+        return message('Show not found', 404)
+
+    async def mark_reserved(rows):
+        if rows:
+            availability = await sync_to_async(get_availability)(show_id)
+            for seat in rows:
+                seat['is_reserved'] = availability.is_taken(seat['id'])
+
+    dependencies = [('seat', theater_id), ('availability', show_id)]
+    return await alist_response(request, Seat.objects.filter(theater_id=theater_id), SeatListSerializer,
+                                dependencies, filters=SEAT_FILTERS, transform=mark_reserved)
@@ -0,0 +1,154 @@
+"""
+Per-show seat availability engine.
+
+Each show has one bitmap in the key-value store. Bit ``i`` is set when the
+seat at position ``i`` of the theater's ``SeatLayout`` is taken by a
+non-cancelled ``Reservation``, so a 2,000-seat house fits in 250 bytes and
+is read with a single ``GET``. Bitmaps are rebuilt from ``Reservation`` rows
+whenever they are missing and are kept current from ``seats_changed``. They
+are keyed by the layout version they index, so a process still holding an
+older layout never reads or writes bits at positions that have moved.
+"""
+from functools import lru_cache
+
+from .kv import get_kv
+from .layout import bump_layout_version, cached_layout, get_layout, layout_version_key
+from .models import Reservation, Show
+
+KEY_PREFIX = 'availability:show:'
+
+
+def availability_key(show_id, version):
+    return f'{KEY_PREFIX}{show_id}:{version}'
+
+
+@lru_cache(maxsize=4096)
+def theater_id_for_show(show_id):
+    return Show.objects.values_list('theater_id', flat=True).get(pk=show_id)
+
+
+class ShowAvailability:
+    def __init__(self, show_id, layout, bitmap):
+        self.show_id = show_id
+        self.layout = layout
+        self.bitmap = bitmap
+
+    def is_position_taken(self, position):
+        byte = position >> 3
+        if byte >= len(self.bitmap):
+            return False
+        return bool(self.bitmap[byte] & (0x80 >> (position & 7)))
+
+    def is_taken(self, seat_id):
+        position = self.layout.positions.get(seat_id)
+        return position is not None and self.is_position_taken(position)
+
+    def taken_seat_ids(self):
+        return [seat_id for position, seat_id in enumerate(self.layout.seat_ids) if self.is_position_taken(position)]
+
+    def free_seat_ids(self):
+        return [seat_id for position, seat_id in enumerate(self.layout.seat_ids) if not self.is_position_taken(position)]
+
+    def to_dict(self):
+        return {
+            'show': self.show_id,
+            'total_seats': len(self.layout),
+            'reserved': self.taken_seat_ids(),
+            'free': self.free_seat_ids(),
+        }
+
+
+def build_bitmap(show_id, layout):
+    bitmap = bytearray((len(layout) + 7) // 8)
+    seat_ids = (
+        Reservation.objects.filter(show_id=show_id)
+        .exclude(status='cancelled')
+        .values_list('seat_id', flat=True)
+    )
+    for seat_id in seat_ids:
+        position = layout.positions.get(seat_id)
+        if position is not None:
+            bitmap[position >> 3] |= 0x80 >> (position & 7)
+    return bytes(bitmap)
+
+
+def rebuild(show_id):
+    """
+    Recompute a show's bitmap from the database and overwrite the stored copy.
+    """
+    layout = get_layout(theater_id_for_show(show_id))
+    bitmap = build_bitmap(show_id, layout)
+    get_kv().set(availability_key(show_id, layout.version), bitmap)
+    return bitmap
+
+
+def _ensure_bitmap(kv, show_id, layout):
+    # SET NX so a rebuild racing with a writer never overwrites newer bits;
+    # whoever loses the race re-reads the stored copy.
+    key = availability_key(show_id, layout.version)
+    bitmap = kv.get(key)
+    if bitmap is None:
+        kv.set(key, build_bitmap(show_id, layout), nx=True)
+        bitmap = kv.get(key)
+    return bitmap
+
+
+def get_availability(show_id):
+    kv = get_kv()
+    theater_id = theater_id_for_show(show_id)
+    layout = cached_layout(theater_id)
+    if layout is not None:
+        # One round trip on the hot path: the shared version and the bitmap
+        # of the version this process has loaded.
+        version, bitmap = kv.mget([layout_version_key(theater_id), availability_key(show_id, layout.version)])
+        if version is not None and int(version) == layout.version and bitmap is not None:
+            return ShowAvailability(show_id, layout, bitmap)
+    layout = get_layout(theater_id)
+    return ShowAvailability(show_id, layout, _ensure_bitmap(kv, show_id, layout))
+
+
+def mark_seats(show_id, seat_ids, taken):
+    """
+    Set (``taken=True``) or clear the bits of ``seat_ids`` in a show's bitmap.
+    """
+    kv = get_kv()
+    layout = get_layout(theater_id_for_show(show_id))
+    _ensure_bitmap(kv, show_id, layout)
+    for seat_id in seat_ids:
+        position = layout.positions.get(seat_id)
+        if position is not None:
+            kv.setbit(availability_key(show_id, layout.version), position, 1 if taken else 0)
+
+
+def confirm_taken(show_id, seat_ids):
+    """
+    Check seats the bitmap marks as taken against the ``Reservation`` rows
+    and return those that really are. Bits without a live reservation, left
+    by a release whose after-commit write failed, are cleared on the way, so
+    a lost write never keeps a seat off sale.
+    """
+    seat_ids = list(seat_ids)
+    if not seat_ids:
+        return []
+    taken = set(
+        Reservation.objects.filter(show_id=show_id, seat_id__in=seat_ids)
+        .exclude(status='cancelled')
+        .values_list('seat_id', flat=True)
+    )
+    stale = [seat_id for seat_id in seat_ids if seat_id not in taken]
+    if stale:
+        mark_seats(show_id, stale, False)
+    return [seat_id for seat_id in seat_ids if seat_id in taken]
+
+
+def advance_layout(theater_id):
+    """
+    Move a theater to a new layout version after its seats or preferences
+    changed, and delete its shows' bitmaps of the previous version; the new
+    ones are built on next read.
+    """
+    previous = bump_layout_version(theater_id) - 1
+    show_ids = Show.objects.filter(theater_id=theater_id).values_list('pk', flat=True)
+    keys = [availability_key(show_id, previous) for show_id in show_ids]
+    if keys:
+        get_kv().delete(*keys)
@@ -0,0 +1,52 @@
+"""
+Best-available search: find contiguous free seats for a show.
+
+Runs entirely on the cached ``SeatLayout`` and the show's availability
+bitmap, so a query costs one key-value read plus a linear scan over the
+layout, with no per-candidate database access.
+"""
+from . import holds
+from .availability import get_availability
+
+
+def find_best_blocks(show_id, count, limit=1):
+    """
+    Return up to ``limit`` non-overlapping blocks of ``count`` adjacent free
+    seats, best score first. Each block is a dict describing the seats.
+    """
+    availability = get_availability(show_id)
+    layout = availability.layout
+    held = {layout.positions[seat_id] for seat_id in holds.held_seat_ids(show_id) if seat_id in layout.positions}
+
+    candidates = []
+    for segment in layout.segments:
+        if len(segment.positions) < count:
+            continue
+        free_run = 0
+        for index, position in enumerate(segment.positions):
+            if availability.is_position_taken(position) or position in held:
+                free_run = 0
+                continue
+            free_run += 1
+            if free_run >= count:
+                start = index + 1 - count
+                candidates.append((segment.window_score(start, count), segment, start))
+
+    candidates.sort(key=lambda candidate: -candidate[0])
+    used = set()
+    blocks = []
+    for score, segment, start in candidates:
+        positions = segment.positions[start:start + count]
+        if used.intersection(positions):
+            continue
+        used.update(positions)
+        blocks.append({
+            'section': segment.section,
+            'row': segment.row,
+            'seats': [layout.seat_ids[position] for position in positions],
+            'seat_numbers': [layout.seat_numbers[position] for position in positions],
+            'score': round(score, 3),
+        })
+        if len(blocks) >= limit:
+            break
+    return blocks
@@ -0,0 +1,175 @@
+"""
+Read-through cache for catalog reads (theaters, shows, seats, seat pricing).
+
+Cache keys embed version counters instead of being deleted on writes. Each
+catalog model has a global version and one per theater; saving or deleting
+a row bumps both after the transaction commits, so every listing that could
+include the row misses on its next read while unrelated listings stay warm.
+Nothing is ever flushed wholesale.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_PREFIX = 'catalog:version:'
+# Versions that change several times a second, like a show's seat
+# availability during an on-sale, carry no modification time: Last-Modified
+# has one-second resolution and would answer If-Modified-Since with a 304
+# for a list that changed within the same second. Reads depending on them
+# are validated by their ETag alone.
+UNDATED_NAMESPACES = frozenset({'availability'})
+
+
+def version_key(namespace, scope=None):
+    if scope is None:
+        return f'{VERSION_PREFIX}{namespace}'
+    return f'{VERSION_PREFIX}{namespace}:{scope}'
+
+
+def _version_keys(dependencies):
+    return [
+        (version_key(namespace, scope), namespace not in UNDATED_NAMESPACES)
+        for namespace, scope in dependencies
+    ]
+
+
+def _collect_versions(keys, found, add):
+    versions = []
+    for key, dated in keys:
+        modified = found.get(f'{key}:modified') if dated else None
+        if key not in found:
+            # Recreated after eviction: a new version, so also a new date.
+            found[key] = add(key)
+            if dated:
+                modified = _touch(key)
+        versions.append((found[key], modified, dated))
+    return versions
+
+
+def get_versions(dependencies):
+    """
+    Fetch the current version of each ``(namespace, scope)`` dependency and,
+    for dated namespaces, its modification time with one ``get_many``.
+    Missing counters start from the current time rather than 1, so a counter
+    lost to eviction never reuses an old version number.
+    """
+    keys = _version_keys(dependencies)
+    found = cache.get_many([key for key, _ in keys] + [f'{key}:modified' for key, dated in keys if dated])
+
+    def add(key):
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+    return _collect_versions(keys, found, add)
+
+
+async def aget_versions(dependencies):
+    """
+    ``get_versions`` through the async cache API.
+    """
+    keys = _version_keys(dependencies)
+    found = await cache.aget_many([key for key, _ in keys] + [f'{key}:modified' for key, dated in keys if dated])
+    missing = {}
+    for key, _ in keys:
+        if key not in found:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            missing[key] = await cache.aget(key)
+    return _collect_versions(keys, found, missing.get)
+
+
+def _touch(key):
+    """
+    Date a change of ``key`` in whole seconds, at least one second after its
+    previous change, so every new version gets a later Last-Modified.
+    """
+    modified_key = f'{key}:modified'
+    modified = max(int(time.time()), int(cache.get(modified_key) or 0) + 1)
+    cache.set(modified_key, modified, timeout=None)
+    return modified
+
+
+def _bump(key, dated):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+    if dated:
+        _touch(key)
+
+
+def bump_version(namespace, scope=None):
+    """
+    Invalidate listings of ``namespace`` (and of ``scope``, usually a
+    theater id) once the current transaction commits. Undated namespaces are
+    only read per scope, so only their scoped version is bumped.
+    """
+    dated = namespace not in UNDATED_NAMESPACES
+    keys = [version_key(namespace)] if dated or scope is None else []
+    if scope is not None:
+        keys.append(version_key(namespace, scope))
+
+    def bump():
+        for key in keys:
+            _bump(key, dated)
+
+    transaction.on_commit(bump, robust=True)
+
+
+class VersionedRead:
+    """
+    A read of ``params`` that depends on ``dependencies`` (``(namespace,
+    scope)`` version pairs). The digest of the current versions names both
+    the cache entry and the HTTP validators, so all of them change together.
+    """
+
+    def __init__(self, dependencies, params, versions=None):
+        if versions is None:
+            versions = get_versions(dependencies)
+        keys = [version_key(namespace, scope) for namespace, scope in dependencies]
+        self.digest = hashlib.sha1(
+            repr((keys, [version for version, _, _ in versions], params)).encode()
+        ).hexdigest()
+        # Undated, or with a date lost to eviction: no Last-Modified at all
+        # rather than one that may predate the content.
+        if all(dated and modified is not None for _, modified, dated in versions):
+            self.last_modified = int(max(modified for _, modified, _ in versions))
+        else:
+            self.last_modified = None
+
+    @classmethod
+    async def acreate(cls, dependencies, params):
+        return cls(dependencies, params, await aget_versions(dependencies))
+
+    @property
+    def etag(self):
+        return f'W/"{self.digest}"'
+
+    def get_or_set(self, producer, timeout=None):
+        key = f'catalog:{self.digest}'
+        value = cache.get(key)
+        if value is None:
+            value = producer()
+            cache.set(key, value, timeout if timeout is not None else settings.CATALOG_CACHE_TIMEOUT)
+        return value
+
+    async def aget_or_set(self, producer, timeout=None):
+        """
+        ``get_or_set`` for async views; ``producer`` is a coroutine function.
+        """
+        key = f'catalog:{self.digest}'
+        value = await cache.aget(key)
+        if value is None:
+            value = await producer()
+            await cache.aset(key, value, timeout if timeout is not None else settings.CATALOG_CACHE_TIMEOUT)
+        return value
+
+
+def read_through(dependencies, params, producer, timeout=None):
+    """
+    Return the cached result of ``producer()`` for ``params``, recomputing
+    it when any version in ``dependencies`` has moved.
+    """
+    return VersionedRead(dependencies, params).get_or_set(producer, timeout)
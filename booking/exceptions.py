@@ -0,0 +1,44 @@
+class SeatTaken(Exception):
+    """
+    Raised when one or more requested seats are no longer available.
+    """
+    code = 'seat_taken'
+
+    def __init__(self, seat_ids):
+        self.seat_ids = tuple(seat_ids)
+        super().__init__(f'Seats already taken: {", ".join(map(str, self.seat_ids))}')
+
+    def as_response_data(self):
+        return {
+            'message': 'Seat already taken for this show',
+            'code': self.code,
+            'seats': list(self.seat_ids),
+        }
+
+
+class HoldExpired(Exception):
+    """
+    Raised when confirming a hold the user no longer owns.
+    """
+    code = 'hold_expired'
+
+    def as_response_data(self):
+        return {'message': 'Your hold on this seat has expired', 'code': self.code}
+
+
+class SeatNotPriced(Exception):
+    """
+    Raised when a quote includes seats with no price for the show.
+    """
+    code = 'seat_not_priced'
+
+    def __init__(self, seat_ids):
+        self.seat_ids = tuple(seat_ids)
+        super().__init__(f'Seats without a price: {", ".join(map(str, self.seat_ids))}')
+
+    def as_response_data(self):
+        return {
+            'message': 'Some seats have no price for this show',
+            'code': self.code,
+            'seats': list(self.seat_ids),
+        }
@@ -1,19 +1,30 @@
 from django import forms
-from .models import Theater, Seat
+from .models import Theater
+from .layout_import import import_layout, numbered_seats
 
 class TheaterCreationForm(forms.ModelForm):
-    num_seats = forms.IntegerField(label="Number of Seats", min_value=1)
+    num_seats = forms.IntegerField(
+        label="Number of Seats", min_value=1, required=False,
+        help_text="Creates seats numbered 1 to N. Leave empty to import a seat layout instead.",
+    )
 
     class Meta:
         model = Theater
         fields = ['name', 'location', 'num_seats']
 
+    def create_seats(self, theater):
+        num_seats = self.cleaned_data.get('num_seats')
+        if num_seats:
+            import_layout(theater, numbered_seats(num_seats))
+
     def save(self, commit=True):
-        theater = super().save(commit=False)
-        num_seats = self.cleaned_data['num_seats']
-        
-        if commit:
-            theater.save()
-            seats = [Seat(theater=theater, seat_number=i) for i in range(1, num_seats + 1)]
-            Seat.objects.bulk_create(seats)
+        creating = self.instance._state.adding
+        theater = super().save(commit=commit)
+        # With commit=False (as in the admin) the caller saves the theater
+        # and then calls create_seats() itself.
+        if commit and creating:
+            self.create_seats(theater)
         return theater
+
+class SeatLayoutImportForm(forms.Form):
+    layout = forms.FileField(help_text="CSV (section,row,seat,price) or JSON layout with price tiers.")
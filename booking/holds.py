@@ -0,0 +1,143 @@
+"""
+Time-limited seat holds.
+
+A hold reserves a (show, seat) pair for one user while they check out. It
+lives only in the key-value store: ``hold:<show>:<seat>`` is written with
+``SET NX EX`` so the first user wins and the key disappears on its own when
+the TTL passes, with no database write per click and no sweep job. A per-show
+sorted set scored by expiry time lists the live holds for seat maps. Refreshing
+and releasing a hold compare the holder and write in one script, so a hold
+that expires and is taken by someone else in between is never overwritten.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+
+from . import pubsub
+from .availability import confirm_taken, get_availability
+from .exceptions import SeatTaken
+from .kv import Script, get_kv
+
+
+def _place(kv, keys, args):
+    holder = kv.get(keys[0])
+    if holder is not None and holder != kv._encode(args[0]):
+        return 0
+    kv.set(keys[0], args[0], ex=int(args[1]))
+    kv.zadd(keys[1], {args[3]: args[2]})
+    return 1
+
+
+def _release(kv, keys, args):
+    if kv.get(keys[0]) != kv._encode(args[0]):
+        return 0
+    kv.delete(keys[0])
+    kv.zrem(keys[1], args[1])
+    return 1
+
+
+# KEYS: hold, show holds; ARGV: user id, ttl, expires at, seat id
+PLACE_HOLD = Script("""
+local holder = redis.call('GET', KEYS[1])
+if holder and holder ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+return 1
+""", _place)
+
+# KEYS: hold, show holds; ARGV: user id, seat id
+RELEASE_HOLD = Script("""
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[2])
+return 1
+""", _release)
+
+
+def hold_key(show_id, seat_id):
+    return f'hold:{show_id}:{seat_id}'
+
+
+def show_holds_key(show_id):
+    return f'holds:show:{show_id}'
+
+
+class Hold:
+    def __init__(self, show_id, seat_id, user_id, expires_at):
+        self.show_id = show_id
+        self.seat_id = seat_id
+        self.user_id = user_id
+        self.expires_at = expires_at
+
+    def to_dict(self):
+        return {
+            'show': self.show_id,
+            'seat': self.seat_id,
+            'user': self.user_id,
+            'expires_at': datetime.fromtimestamp(self.expires_at, tz=dt_timezone.utc).isoformat(),
+        }
+
+
+def get_holder(show_id, seat_id):
+    """
+    Return the id of the user holding the seat, or ``None``.
+    """
+    value = get_kv().get(hold_key(show_id, seat_id))
+    return int(value) if value is not None else None
+
+
+def get_holders(show_id, seat_ids):
+    """
+    Map each seat id to the id of the user holding it (or ``None``) with one ``MGET``.
+    """
+    seat_ids = list(seat_ids)
+    values = get_kv().mget([hold_key(show_id, seat_id) for seat_id in seat_ids])
+    return {seat_id: int(value) if value is not None else None for seat_id, value in zip(seat_ids, values)}
+
+
+def place_hold(show, seat, user, ttl=None):
+    """
+    Hold ``seat`` for ``user`` for ``ttl`` seconds (``SEAT_HOLD_TTL`` by
+    default). Holding a seat again refreshes the TTL; a seat held by someone
+    else or already reserved raises ``SeatTaken``.
+    """
+    ttl = ttl or settings.SEAT_HOLD_TTL
+    if get_availability(show.id).is_taken(seat.id) and confirm_taken(show.id, [seat.id]):
+        raise SeatTaken([seat.id])
+
+    expires_at = time.time() + ttl
+    keys = [hold_key(show.id, seat.id), show_holds_key(show.id)]
+    if not PLACE_HOLD(keys=keys, args=[user.id, ttl, expires_at, seat.id]):
+        raise SeatTaken([seat.id])
+
+    hold = Hold(show.id, seat.id, user.id, expires_at)
+    pubsub.publish(show.id, {'type': 'hold', 'seat': seat.id, 'expires_at': hold.to_dict()['expires_at']})
+    return hold
+
+
+def release_hold(show_id, seat_id, user_id):
+    """
+    Drop a user's hold early. Returns ``False`` if they did not hold the seat.
+    """
+    keys = [hold_key(show_id, seat_id), show_holds_key(show_id)]
+    if not RELEASE_HOLD(keys=keys, args=[user_id, seat_id]):
+        return False
+    pubsub.publish(show_id, {'type': 'unhold', 'seat': seat_id})
+    return True
+
+
+def held_seat_ids(show_id):
+    """
+    Seat ids with a live hold for the show. Expired entries are trimmed from
+    the index here, the keys themselves have already expired.
+    """
+    kv = get_kv()
+    now = time.time()
+    kv.zremrangebyscore(show_holds_key(show_id), '-inf', now)
+    return [int(member) for member in kv.zrangebyscore(show_holds_key(show_id), now, '+inf')]
+
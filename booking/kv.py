@@ -0,0 +1,189 @@
+"""
+Key-value store for seat state that changes too often for the database.
+
+In production this is the Redis instance configured by ``REDIS_DB_URL``.
+Setting ``BOOKING_KV_BACKEND = 'memory'`` swaps in ``MemoryStore``, a
+process-local stand-in implementing the subset of the Redis client API the
+booking app uses, so tests and local runs need no Redis server.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class MemoryStore:
+    """
+    Thread-safe, in-process implementation of the Redis commands we use.
+    Values are stored as bytes, like Redis returns them.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value
+        if isinstance(value, bytearray):
+            return bytes(value)
+        return str(value).encode()
+
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            if not self._alive(key):
+                return None
+            return bytes(self._data[key])
+
+    def mget(self, keys):
+        with self._lock:
+            return [bytes(self._data[key]) if self._alive(key) else None for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = bytearray(self._encode(value))
+            self._expires.pop(key, None)
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+            return True
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = int(self._data[key]) + amount if self._alive(key) else amount
+            self._data[key] = bytearray(self._encode(value))
+            return value
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    del self._data[key]
+                    self._expires.pop(key, None)
+                    removed += 1
+            return removed
+
+    def exists(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._alive(key))
+
+    def setbit(self, key, offset, value):
+        with self._lock:
+            if not self._alive(key):
+                self._data[key] = bytearray()
+            data = self._data[key]
+            byte, mask = offset >> 3, 0x80 >> (offset & 7)
+            if byte >= len(data):
+                data.extend(bytes(byte + 1 - len(data)))
+            previous = 1 if data[byte] & mask else 0
+            if value:
+                data[byte] |= mask
+            else:
+                data[byte] &= ~mask
+            return previous
+
+    def getbit(self, key, offset):
+        with self._lock:
+            if not self._alive(key):
+                return 0
+            data = self._data[key]
+            byte = offset >> 3
+            if byte >= len(data):
+                return 0
+            return 1 if data[byte] & (0x80 >> (offset & 7)) else 0
+
+    def zadd(self, key, mapping):
+        with self._lock:
+            if not self._alive(key):
+                self._data[key] = {}
+            zset = self._data[key]
+            added = sum(1 for member in mapping if self._encode(member) not in zset)
+            for member, score in mapping.items():
+                zset[self._encode(member)] = float(score)
+            return added
+
+    def zrem(self, key, *members):
+        with self._lock:
+            if not self._alive(key):
+                return 0
+            zset = self._data[key]
+            return sum(1 for member in members if zset.pop(self._encode(member), None) is not None)
+
+    def zrangebyscore(self, key, min, max):
+        with self._lock:
+            if not self._alive(key):
+                return []
+            low, high = float(min), float(max)
+            members = sorted(self._data[key].items(), key=lambda item: (item[1], item[0]))
+            return [member for member, score in members if low <= score <= high]
+
+    def zremrangebyscore(self, key, min, max):
+        with self._lock:
+            if not self._alive(key):
+                return 0
+            low, high = float(min), float(max)
+            zset = self._data[key]
+            doomed = [member for member, score in zset.items() if low <= score <= high]
+            for member in doomed:
+                del zset[member]
+            return len(doomed)
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            return True
+
+
+class Script:
+    """
+    A Lua script that Redis runs atomically, paired with a Python twin that
+    ``MemoryStore`` runs under its lock. The twin is called as
+    ``function(kv, keys, args)`` and must do exactly what the Lua does.
+    """
+
+    def __init__(self, lua, function):
+        self.lua = lua
+        self.function = function
+        self._client = None
+        self._script = None
+
+    def __call__(self, keys=(), args=()):
+        kv = get_kv()
+        if isinstance(kv, MemoryStore):
+            with kv._lock:
+                return self.function(kv, list(keys), list(args))
+        if self._client is not kv:
+            self._script = kv.register_script(self.lua)
+            self._client = kv
+        return self._script(keys=list(keys), args=list(args))
+
+
+def get_kv():
+    """
+    Return the shared key-value client for this process.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if settings.BOOKING_KV_BACKEND == 'memory':
+                    _client = MemoryStore()
+                else:
+                    import redis
+                    _client = redis.Redis.from_url(settings.REDIS_DB_URL)
+    return _client
@@ -0,0 +1,178 @@
+"""
+In-memory seat layout index.
+
+Every seat of a theater gets a stable position (its rank by primary key), so
+per-show state can be stored in compact bitmaps and arrays indexed by
+position instead of one row or key per seat. New seats are appended at the
+end, which keeps existing positions valid; deleting a seat shifts positions,
+so callers must invalidate both the layout and any state indexed by it.
+
+Layouts are cached per process but versioned in the key-value store: a seat
+or theater change bumps ``layout:version:<theater>`` on commit, every reader
+compares its cached layout's version with the shared one before using it,
+and state indexed by positions is stored under the version it was built for.
+
+Seat numbers of the form ``[SECTION-]ROW NUMBER`` (``ORCH-F12``, ``B7``,
+``42``) are also parsed into rows of physically adjacent seats, and each seat
+is scored against the theater's ``seat_preferences`` once per load, which is
+what the best-available search runs on.
+"""
+import re
+import threading
+import time
+
+from .kv import get_kv
+from .models import Seat, Theater
+
+SEAT_NUMBER_RE = re.compile(r'^(?:(?P<section>[^-]+)-)?(?P<row>[A-Za-z]*)(?P<number>\d+)$')
+
+_layouts = {}
+_lock = threading.Lock()
+
+
+def parse_seat_number(seat_number):
+    """
+    Split a seat number into ``(section, row, number)``; ``number`` is
+    ``None`` when the seat does not follow the naming scheme.
+    """
+    match = SEAT_NUMBER_RE.match(seat_number.strip())
+    if match is None:
+        return '', seat_number, None
+    return match['section'] or '', match['row'].upper(), int(match['number'])
+
+
+class Segment:
+    """
+    A run of consecutively numbered seats in one row, as layout positions.
+    ``prefix`` holds running sums of the seat scores for O(1) window scores.
+    """
+
+    def __init__(self, section, row, positions, scores):
+        self.section = section
+        self.row = row
+        self.positions = positions
+        self.prefix = [0.0]
+        for position in positions:
+            self.prefix.append(self.prefix[-1] + scores[position])
+
+    def window_score(self, start, size):
+        return self.prefix[start + size] - self.prefix[start]
+
+
+class SeatLayout:
+    def __init__(self, theater_id, seats, preferences=None, version=None):
+        seats = sorted(seats)
+        self.theater_id = theater_id
+        self.version = version
+        self.seat_ids = tuple(seat_id for seat_id, _ in seats)
+        self.seat_numbers = tuple(seat_number for _, seat_number in seats)
+        self.positions = {seat_id: position for position, seat_id in enumerate(self.seat_ids)}
+        self._build_segments(preferences or {})
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+    def __repr__(self):
+        return f'<SeatLayout theater={self.theater_id} version={self.version} seats={len(self)}>'
+
+    def _build_segments(self, preferences):
+        rows = {}
+        loose = []
+        for position, seat_number in enumerate(self.seat_numbers):
+            section, row, number = parse_seat_number(seat_number)
+            if number is None:
+                loose.append((section, row, position))
+            else:
+                rows.setdefault((section, row), []).append((number, position))
+
+        section_weights = preferences.get('sections', {})
+        row_weights = preferences.get('rows', {})
+        center_weight = float(preferences.get('center', 1))
+
+        self.scores = [0.0] * len(self.seat_ids)
+        self.segments = []
+        for (section, row), seats in rows.items():
+            seats.sort()
+            base = float(section_weights.get(section, 0)) + float(row_weights.get(row, 0))
+            first, last = seats[0][0], seats[-1][0]
+            middle, half_width = (first + last) / 2, max((last - first) / 2, 1)
+            for number, position in seats:
+                self.scores[position] = base + center_weight * (1 - abs(number - middle) / half_width)
+
+            run = [seats[0][1]]
+            for (previous, _), (number, position) in zip(seats, seats[1:]):
+                if number != previous + 1:
+                    self.segments.append(Segment(section, row, run, self.scores))
+                    run = []
+                run.append(position)
+            self.segments.append(Segment(section, row, run, self.scores))
+
+        for section, row, position in loose:
+            self.scores[position] = float(section_weights.get(section, 0))
+            self.segments.append(Segment(section, row, [position], self.scores))
+
+
+def layout_version_key(theater_id):
+    return f'layout:version:{theater_id}'
+
+
+def current_version(theater_id):
+    """
+    Return a theater's shared layout version. A missing counter starts from
+    the current time rather than 1, so one lost to eviction never reuses an
+    old version number.
+    """
+    kv = get_kv()
+    key = layout_version_key(theater_id)
+    version = kv.get(key)
+    if version is None:
+        kv.set(key, time.time_ns(), nx=True)
+        version = kv.get(key)
+    return int(version)
+
+
+def build_layout(theater_id, version=None):
+    # The version is read before the seats, so a change committed in
+    # between leaves the layout looking older than it is, never newer.
+    if version is None:
+        version = current_version(theater_id)
+    seats = Seat.objects.filter(theater_id=theater_id).values_list('pk', 'seat_number')
+    preferences = Theater.objects.values_list('seat_preferences', flat=True).filter(pk=theater_id).first()
+    return SeatLayout(theater_id, seats, preferences, version)
+
+
+def cached_layout(theater_id):
+    """
+    Return this process's layout for a theater without checking its version,
+    or ``None``. Callers must compare ``layout.version`` with the shared one.
+    """
+    return _layouts.get(theater_id)
+
+
+def get_layout(theater_id, version=None):
+    """
+    Return the cached layout for a theater, loading it on a miss or when it
+    is older than the shared version (``version``, if already read).
+    """
+    if version is None:
+        version = current_version(theater_id)
+    layout = _layouts.get(theater_id)
+    if layout is None or layout.version != version:
+        layout = build_layout(theater_id, version)
+        with _lock:
+            _layouts[theater_id] = layout
+    return layout
+
+
+def invalidate_layout(theater_id):
+    with _lock:
+        _layouts.pop(theater_id, None)
+
+
+def bump_layout_version(theater_id):
+    """
+    Move a theater to a new layout version, so every process reloads its
+    layout before using it again. Returns the new version.
+    """
+    invalidate_layout(theater_id)
+    return get_kv().incr(layout_version_key(theater_id))
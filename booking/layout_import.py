@@ -0,0 +1,216 @@
+"""
+Seat layout import for new venues.
+
+Layouts describe sections, rows, seat numbers and prices, either as CSV
+(one seat per line)::
+
+    section,row,seat,price
+    ORCH,F,12,95.00
+
+or as JSON with named price tiers and seat ranges::
+
+    {"tiers": {"A": "120.00", "B": "80.00"},
+     "sections": [{"name": "ORCH", "tier": "A",
+                   "rows": [{"row": "F", "seats": "1-24"},
+                            {"row": "G", "seats": ["1-10", 14], "tier": "B"}]}]}
+
+Seats are numbered ``SECTION-ROWNUMBER`` (``ORCH-F12``), or ``ROWNUMBER``
+without a section, which is the scheme ``booking.layout`` parses. Entries
+are read lazily and written in batches, through ``COPY`` on PostgreSQL and
+``bulk_create`` elsewhere, so the whole layout never sits in memory as
+model instances.
+"""
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+
+from .cache import bump_version
+from .models import Seat, SeatPricing
+from .signals import seats_bulk_created
+
+SEAT_NUMBER_MAX_LENGTH = Seat._meta.get_field('seat_number').max_length
+
+
+class LayoutError(ValueError):
+    pass
+
+
+def seat_entry(section, row, number, price, where):
+    """
+    Validate one seat and return ``(seat_number, price)``.
+    """
+    section, row, number = (section or '').strip(), (row or '').strip().upper(), str(number).strip()
+    if not number.isdigit():
+        raise LayoutError(f'{where}: seat number {number!r} is not a number')
+    if '-' in section or (row and not row.isalpha()):
+        raise LayoutError(f'{where}: invalid section {section!r} or row {row!r}')
+    seat_number = f'{section}-{row}{number}' if section else f'{row}{number}'
+    if len(seat_number) > SEAT_NUMBER_MAX_LENGTH:
+        raise LayoutError(f'{where}: seat number {seat_number!r} is longer than {SEAT_NUMBER_MAX_LENGTH} characters')
+    if price in (None, ''):
+        return seat_number, None
+    try:
+        price = Decimal(str(price))
+    except InvalidOperation:
+        raise LayoutError(f'{where}: invalid price {price!r}')
+    if price < 0:
+        raise LayoutError(f'{where}: negative price {price}')
+    return seat_number, price
+
+
+def read_csv(lines):
+    """
+    Yield seats from CSV ``lines`` with ``row``, ``seat`` and optional
+    ``section`` and ``price`` columns.
+    """
+    reader = csv.DictReader(lines)
+    missing = {'row', 'seat'} - set(reader.fieldnames or ())
+    if missing:
+        raise LayoutError(f'CSV layout is missing columns: {", ".join(sorted(missing))}')
+    for line_number, record in enumerate(reader, start=2):
+        yield seat_entry(
+            record.get('section'), record['row'], record['seat'], record.get('price'), f'line {line_number}'
+        )
+
+
+JSON_TYPE_NAMES = {dict: 'an object', list: 'a list', str: 'a string'}
+
+
+def expect(value, kind, where):
+    """
+    Return ``value`` if it is of JSON type ``kind``, else raise ``LayoutError``
+    naming ``where`` it was found.
+    """
+    if not isinstance(value, kind):
+        raise LayoutError(f'{where}: expected {JSON_TYPE_NAMES[kind]}, got {json.dumps(value)[:50]}')
+    return value
+
+
+def expand_seats(spec, where):
+    items = spec if isinstance(spec, list) else [spec]
+    for item in items:
+        if isinstance(item, bool) or not isinstance(item, (str, int)):
+            raise LayoutError(f'{where}: invalid seat {json.dumps(item)[:50]}')
+        if isinstance(item, str) and '-' in item:
+            first, _, last = item.partition('-')
+            try:
+                first, last = int(first), int(last)
+            except ValueError:
+                raise LayoutError(f'{where}: invalid seat range {item!r}')
+            yield from range(first, last + 1)
+        else:
+            yield item
+
+
+def read_json(layout):
+    """
+    Yield seats from a parsed JSON layout (see the module docstring).
+    """
+    expect(layout, dict, 'layout')
+    tiers = expect(layout.get('tiers', {}), dict, 'tiers')
+    for section_index, section in enumerate(expect(layout.get('sections', []), list, 'sections')):
+        path = f'sections[{section_index}]'
+        expect(section, dict, path)
+        name = expect(section.get('name') or '', str, f'{path}.name')
+        for row_index, row in enumerate(expect(section.get('rows', []), list, f'{path}.rows')):
+            row_path = f'{path}.rows[{row_index}]'
+            expect(row, dict, row_path)
+            expect(row.get('row') or '', str, f'{row_path}.row')
+            where = f'section {name!r} row {row.get("row")!r}'
+            tier = row.get('tier', section.get('tier'))
+            if tier is not None and (not isinstance(tier, str) or tier not in tiers):
+                raise LayoutError(f'{where}: unknown tier {tier!r}')
+            price = row.get('price', section.get('price', tiers.get(tier)))
+            for number in expand_seats(row.get('seats', []), where):
+                yield seat_entry(name, row.get('row', ''), number, price, where)
+
+
+def read_layout(file, name=''):
+    """
+    Return an iterator of ``(seat_number, price)`` from an uploaded or opened
+    layout file, choosing the format by extension (CSV by default).
+    """
+    if name.lower().endswith('.json'):
+        try:
+            layout = json.load(file)
+        except ValueError as error:
+            raise LayoutError(f'Invalid JSON layout: {error}')
+        return read_json(layout)
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    return read_csv(file)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def copy_rows(table, columns, rows):
+    """
+    Load ``rows`` into ``table`` with PostgreSQL ``COPY FROM STDIN``.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    sql = f'COPY {quote(table)} ({", ".join(quote(column) for column in columns)}) FROM STDIN WITH (FORMAT csv)'
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def insert_batch(theater, batch):
+    numbers = [seat_number for seat_number, _ in batch]
+    if connection.vendor == 'postgresql':
+        copy_rows(Seat._meta.db_table, ['theater_id', 'seat_number', 'is_reserved'],
+                  ((theater.id, seat_number, False) for seat_number in numbers))
+        seat_ids = dict(
+            Seat.objects.filter(theater=theater, seat_number__in=numbers).values_list('seat_number', 'id')
+        )
+        copy_rows(SeatPricing._meta.db_table, ['seat_id', 'price'],
+                  ((seat_ids[seat_number], price) for seat_number, price in batch if price is not None))
+        return
+    seats = Seat.objects.bulk_create([Seat(theater=theater, seat_number=seat_number) for seat_number in numbers])
+    SeatPricing.objects.bulk_create(
+        [SeatPricing(seat=seat, price=price) for seat, (_, price) in zip(seats, batch) if price is not None]
+    )
+
+
+def import_layout(theater, entries, batch_size=1000):
+    """
+    Add the seats in ``entries`` to ``theater`` in one transaction and
+    return how many were created. Seat numbers already in the theater or
+    repeated in the layout raise ``LayoutError`` and nothing is saved.
+    """
+    with transaction.atomic():
+        seen = set(Seat.objects.filter(theater=theater).values_list('seat_number', flat=True))
+        created = 0
+        for batch in batches(entries, batch_size):
+            for seat_number, _ in batch:
+                if seat_number in seen:
+                    raise LayoutError(f'Seat {seat_number} already exists or is listed twice')
+                seen.add(seat_number)
+            insert_batch(theater, batch)
+            created += len(batch)
+        theater.total_seats = len(seen)
+        theater.save(update_fields=['total_seats'])
+        seats_bulk_created(theater.id)
+        bump_version('seatpricing', theater.id)
+    return created
+
+
+def numbered_seats(count):
+    """
+    Entries for seats ``1`` to ``count`` without prices.
+    """
+    return ((str(number), None) for number in range(1, count + 1))
@@ -0,0 +1,174 @@
+import asyncio
+import io
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.tokens import AccessToken
+
+from booking.models import Theater, Show, Seat
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the theater, show and seat listings in-process through the WSGI and the ASGI '
+        'application under the same client concurrency and report requests/s and latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64, help='Clients with a request in flight.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per application.')
+        parser.add_argument('--wsgi-threads', type=int, default=8,
+                            help='Worker threads of the WSGI server (e.g. gunicorn --threads).')
+        parser.add_argument('--seats', type=int, default=500, help='Seats in the benchmark theater.')
+        parser.add_argument('--db-latency', type=float, default=0,
+                            help='Milliseconds added to every query, to stand in for a remote or busy database.')
+        parser.add_argument('--uncached', action='store_true',
+                            help='Make every URL unique so each request misses the catalog cache.')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated theater, show and user.')
+
+    def handle(self, *args, **options):
+        sync_only = [path for path in settings.MIDDLEWARE if not getattr(import_string(path), 'async_capable', False)]
+        if sync_only:
+            self.stderr.write(self.style.WARNING(
+                f'Sync-only middleware puts every ASGI request on a thread: {", ".join(sync_only)}'
+            ))
+
+        tag = uuid.uuid4().hex[:8]
+        theater = Theater.objects.create(name=f'bench-{tag}', location=f'bench-{tag}', total_seats=options['seats'])
+        Seat.objects.bulk_create(
+            [Seat(theater=theater, seat_number=str(i)) for i in range(1, options['seats'] + 1)]
+        )
+        show = Show.objects.create(
+            theater=theater, title=f'bench-{tag}', description='ASGI benchmark',
+            date=timezone.now().date(), time=timezone.now().time(),
+        )
+        user = User.objects.create_user(f'bench-{tag}', f'bench-{tag}@example.com')
+        token = str(AccessToken.for_user(user))
+        paths = [
+            f'/api/theaters/?location=bench-{tag}',
+            f'/api/shows/?theater_id={theater.id}',
+            f'/api/seats/?show_id={show.id}',
+        ]
+
+        # Imported here: loading the ASGI module sets up its URLconf and push router.
+        from theatre_booking_system.asgi import application as asgi_application
+
+        delay = options['db_latency'] / 1000
+
+        def slow_execute(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_latency(connection, **kwargs):
+            # Fired again each time a thread's connection reopens.
+            if slow_execute not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_execute)
+
+        if delay:
+            # Requests run on their own threads, each opening its own connection.
+            connection_created.connect(add_latency)
+
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'localhost']):
+                for label, call in (
+                    ('wsgi', self.wsgi_caller(get_wsgi_application(), token, options['wsgi_threads'])),
+                    ('asgi', self.asgi_caller(asgi_application, token)),
+                ):
+                    self.report(label, asyncio.run(self.run_clients(call, paths, options)), options['requests'])
+        finally:
+            connection_created.disconnect(add_latency)
+            if not options['keep']:
+                theater.delete()
+                user.delete()
+
+    def wsgi_caller(self, application, token, threads):
+        executor = ThreadPoolExecutor(max_workers=threads)
+
+        def request(path):
+            path, _, query = path.partition('?')
+            environ = {
+                'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': path, 'QUERY_STRING': query,
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+                'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+            }
+            statuses = []
+            result = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            try:
+                b''.join(result)
+            finally:
+                result.close()
+            return int(statuses[0].split()[0])
+
+        async def call(path):
+            return await asyncio.get_running_loop().run_in_executor(executor, request, path)
+
+        return call
+
+    def asgi_caller(self, application, token):
+        async def call(path):
+            path, _, query = path.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+                'query_string': query.encode(), 'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+                'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+            }
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            statuses = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await asyncio.Event().wait()  # The client never disconnects.
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            await application(scope, receive, send)
+            return statuses[0]
+
+        return call
+
+    async def run_clients(self, call, paths, options):
+        for path in paths:  # Warm up connections, caches and the seat layout.
+            await call(path)
+        total = options['requests']
+        issued = iter(range(total))
+        latencies, statuses = [], Counter()
+
+        async def client():
+            for number in issued:
+                path = paths[number % len(paths)]
+                if options['uncached']:
+                    path = f'{path}&nonce={number}'
+                started = time.perf_counter()
+                statuses[await call(path)] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['concurrency'])))
+        return time.perf_counter() - started, sorted(latencies), statuses
+
+    def report(self, label, result, total):
+        elapsed, latencies, statuses = result
+        errors = total - statuses[200]
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+        self.stdout.write(
+            f'{label}  {total} requests  {total / elapsed:8.1f} req/s  '
+            f'p50: {percentile(0.50):7.1f} ms  p99: {percentile(0.99):7.1f} ms  errors: {errors}'
+        )
@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from booking.models import Theater, Show, Seat
+from booking.exceptions import SeatTaken
+from booking.services import reserve_seat
+
+
+class Command(BaseCommand):
+    help = 'Hammer one show with concurrent reservations and report throughput and conflict rate.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--attempts', type=int, default=50, help='Reservation attempts per thread.')
+        parser.add_argument('--seats', type=int, default=500, help='Seats in the benchmark theater.')
+        parser.add_argument('--hot-seats', type=int, default=50,
+                            help='Seats the threads compete for; lower means more contention.')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated theater, show and users.')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        tag = uuid.uuid4().hex[:8]
+        theater = Theater.objects.create(name=f'bench-{tag}', location='bench', total_seats=options['seats'])
+        Seat.objects.bulk_create(
+            [Seat(theater=theater, seat_number=str(i)) for i in range(1, options['seats'] + 1)]
+        )
+        show = Show.objects.create(
+            theater=theater, title=f'bench-{tag}', description='Reservation benchmark',
+            date=timezone.now().date(), time=timezone.now().time(),
+        )
+        users = User.objects.bulk_create(
+            [User(username=f'bench-{tag}-{i}', email=f'bench-{tag}-{i}@example.com') for i in range(threads)]
+        )
+        hot_seats = list(Seat.objects.filter(theater=theater).order_by('pk')[:options['hot_seats']])
+
+        results = Counter()
+        results_lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker(user):
+            local = Counter()
+            barrier.wait()
+            try:
+                for _ in range(options['attempts']):
+                    try:
+                        reserve_seat(user, show, random.choice(hot_seats))
+                        local['reserved'] += 1
+                    except SeatTaken:
+                        local['conflicts'] += 1
+                    except DatabaseError:
+                        local['errors'] += 1
+            finally:
+                connection.close()
+            with results_lock:
+                results.update(local)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, users))
+        elapsed = time.perf_counter() - started
+
+        attempts = threads * options['attempts']
+        self.stdout.write(f'threads:       {threads}')
+        self.stdout.write(f'attempts:      {attempts}')
+        self.stdout.write(f'reserved:      {results["reserved"]}')
+        self.stdout.write(f'conflicts:     {results["conflicts"]}')
+        self.stdout.write(f'errors:        {results["errors"]}')
+        self.stdout.write(f'elapsed:       {elapsed:.3f}s')
+        self.stdout.write(f'throughput:    {attempts / elapsed:.1f} attempts/s')
+        self.stdout.write(f'conflict rate: {results["conflicts"] / attempts:.1%}')
+
+        if results['reserved'] > len(hot_seats):
+            self.stderr.write(self.style.ERROR('More reservations than seats: double booking detected.'))
+
+        if not options['keep']:
+            theater.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
@@ -0,0 +1,77 @@
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from booking.models import Theater, Show, Seat
+from booking.serializers import (
+    TheaterSerializer, ShowSerializer, SeatSerializer,
+    TheaterListSerializer, ShowListSerializer, SeatListSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare the ModelSerializer listings with the values_list() fast path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per serializer; the best is reported.')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        # Fixtures are created inside a transaction that is rolled back at the end.
+        with transaction.atomic():
+            self.create_fixtures(rows)
+            for label, queryset, slow, fast in (
+                ('theaters', Theater.objects.filter(location='bench'), TheaterSerializer, TheaterListSerializer),
+                ('shows', Show.objects.filter(theater__location='bench'), ShowSerializer, ShowListSerializer),
+                ('seats', Seat.objects.filter(theater__location='bench'), SeatSerializer, SeatListSerializer),
+            ):
+                self.compare(label, queryset, slow, fast, options['repeat'])
+            transaction.set_rollback(True)
+
+    def create_fixtures(self, rows):
+        theaters = Theater.objects.bulk_create(
+            [Theater(name=f'Bench {i}', location='bench', total_seats=100) for i in range(rows)]
+        )
+        first_day = datetime.date(2030, 1, 1)
+        Show.objects.bulk_create(
+            [
+                Show(
+                    theater=theater, title=f'Bench show {i}', description='Benchmark fixture',
+                    date=first_day + datetime.timedelta(days=i % 365), time=datetime.time(20),
+                )
+                for i, theater in enumerate(theaters)
+            ],
+            batch_size=2000,
+        )
+        Seat.objects.bulk_create(
+            [Seat(theater=theaters[i % len(theaters)], seat_number=str(i)) for i in range(rows)],
+            batch_size=2000,
+        )
+
+    def best_of(self, repeat, func):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def compare(self, label, queryset, slow, fast, repeat):
+        slow_time, slow_data = self.best_of(repeat, lambda: slow(queryset.all(), many=True).data)
+        fast_time, fast_data = self.best_of(
+            repeat, lambda: fast(fast.prepare_queryset(queryset.all()), many=True).data
+        )
+        if json.dumps(slow_data, cls=DjangoJSONEncoder) != json.dumps(fast_data, cls=DjangoJSONEncoder):
+            raise CommandError(f'{label}: fast serializer output differs from {slow.__name__}')
+        self.stdout.write(
+            f'{label:<9} {len(fast_data):>7} rows  '
+            f'{slow.__name__}: {slow_time * 1000:8.1f} ms  '
+            f'{fast.__name__}: {fast_time * 1000:8.1f} ms  '
+            f'speedup: {slow_time / fast_time:5.1f}x'
+        )
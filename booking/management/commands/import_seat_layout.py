@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.layout_import import LayoutError, import_layout, read_layout
+from booking.models import Theater
+
+
+class Command(BaseCommand):
+    help = 'Add seats and prices to a theater from a CSV or JSON seat layout.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('theater_id', type=int)
+        parser.add_argument('layout', help='Path to a .csv or .json layout file.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            theater = Theater.objects.get(pk=options['theater_id'])
+        except Theater.DoesNotExist:
+            raise CommandError(f'Theater {options["theater_id"]} does not exist')
+        path = options['layout']
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as layout:
+                created = import_layout(theater, read_layout(layout, path), options['batch_size'])
+        except (OSError, LayoutError) as error:
+            raise CommandError(str(error))
+        self.stdout.write(f'Imported {created} seats into {theater.name}')
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from booking.outbox import purge_published, relay_batch
+
+# Seconds between deletions of old published events
+PURGE_INTERVAL = 10 * 60
+
+
+class Command(BaseCommand):
+    help = 'Publish pending outbox events to Celery in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit.')
+        parser.add_argument('--retention', type=int, default=24 * 60 * 60,
+                            help='Seconds to keep published events before deleting them.')
+
+    def handle(self, *args, **options):
+        retention = timezone.timedelta(seconds=options['retention'])
+        next_purge = 0
+        while True:
+            published = 0
+            while True:
+                sent = relay_batch(options['batch_size'])
+                published += sent
+                if sent < options['batch_size']:
+                    break
+            purged = 0
+            if time.monotonic() >= next_purge:
+                purged = purge_published(timezone.now() - retention)
+                next_purge = time.monotonic() + PURGE_INTERVAL
+            if published or purged:
+                self.stdout.write(f'Published {published} events, purged {purged}')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
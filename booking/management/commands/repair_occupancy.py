@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from booking.models import Reservation, Show, ShowOccupancy
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-show occupancy counters from reservations and report drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Shows per transaction.')
+
+    def handle(self, *args, **options):
+        drifted = checked = 0
+        last_pk = 0
+        while True:
+            show_ids = list(
+                Show.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not show_ids:
+                break
+            last_pk = show_ids[-1]
+            with transaction.atomic():
+                # Locking the counters keeps reservations of these shows from
+                # moving them between the count and the write.
+                stored = {
+                    occupancy.show_id: occupancy
+                    for occupancy in ShowOccupancy.objects.select_for_update().filter(show_id__in=show_ids)
+                }
+                actual = {show_id: {'reserved': 0, 'paid': 0} for show_id in show_ids}
+                counts = (
+                    Reservation.objects.filter(show_id__in=show_ids).exclude(status='cancelled').order_by()
+                    .values_list('show_id', 'status').annotate(total=Count('id'))
+                )
+                for show_id, status, total in counts:
+                    actual[show_id][status] = total
+
+                missing = []
+                for show_id, counts in actual.items():
+                    occupancy = stored.get(show_id)
+                    if occupancy is None:
+                        missing.append(ShowOccupancy(show_id=show_id, **counts))
+                        continue
+                    if (occupancy.reserved, occupancy.paid) != (counts['reserved'], counts['paid']):
+                        drifted += 1
+                        self.stdout.write(
+                            f'Show {show_id}: reserved {occupancy.reserved} -> {counts["reserved"]}, '
+                            f'paid {occupancy.paid} -> {counts["paid"]}'
+                        )
+                        if not options['dry_run']:
+                            ShowOccupancy.objects.filter(show_id=show_id).update(**counts)
+                if missing and not options['dry_run']:
+                    ShowOccupancy.objects.bulk_create(missing)
+            checked += len(show_ids)
+        verb = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(f'Checked {checked} shows, {verb} {drifted} with drift')
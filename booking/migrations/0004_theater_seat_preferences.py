@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_alter_theater_total_seats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='theater',
+            name='seat_preferences',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
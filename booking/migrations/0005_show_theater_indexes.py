@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_theater_seat_preferences'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['date', 'theater'], name='show_date_theater_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='theater',
+            index=models.Index(fields=['location'], name='theater_location_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:25
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_outboxevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='show',
+            name='payment_window',
+            field=models.DurationField(default=datetime.timedelta(seconds=900)),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'reserved_at'], name='reservation_status_time_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_reservation_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceZone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('theater', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_zones', to='booking.theater')),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('theater', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='seat',
+            name='price_zone',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='seats', to='booking.pricezone'),
+        ),
+        migrations.CreateModel(
+            name='ShowPriceOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('show', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_overrides', to='booking.show')),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='show_overrides', to='booking.pricezone')),
+            ],
+            options={
+                'unique_together': {('show', 'zone')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_price_zones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='show',
+            name='pricing_curve',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_occupancy(apps, schema_editor):
+    # Count existing reservations so shows sold before the counters existed
+    # do not report an empty house.
+    Reservation = apps.get_model('booking', 'Reservation')
+    Show = apps.get_model('booking', 'Show')
+    ShowOccupancy = apps.get_model('booking', 'ShowOccupancy')
+    counts = {
+        row['show_id']: row
+        for row in Reservation.objects.order_by().values('show_id').annotate(
+            reserved=models.Count('id', filter=models.Q(status='reserved')),
+            paid=models.Count('id', filter=models.Q(status='paid')),
+        )
+    }
+    ShowOccupancy.objects.bulk_create(
+        (
+            ShowOccupancy(
+                show_id=show_id,
+                reserved=counts.get(show_id, {}).get('reserved', 0),
+                paid=counts.get(show_id, {}).get('paid', 0),
+            )
+            for show_id in Show.objects.values_list('pk', flat=True).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_show_pricing_curve'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShowOccupancy',
+            fields=[
+                ('show', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='occupancy', serialize=False, to='booking.show')),
+                ('reserved', models.IntegerField(default=0)),
+                ('paid', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_occupancy, migrations.RunPython.noop),
+    ]
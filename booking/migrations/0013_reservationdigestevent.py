@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_ticketsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationDigestEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reservations', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('show', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_events', to='booking.show')),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_expires_at(apps, schema_editor):
+    # Unpaid reservations made before the column existed expire as before.
+    Reservation = apps.get_model('booking', 'Reservation')
+    Show = apps.get_model('booking', 'Show')
+    payment_window = models.Subquery(Show.objects.filter(pk=models.OuterRef('show_id')).values('payment_window'))
+    Reservation.objects.filter(status='reserved').update(
+        expires_at=models.ExpressionWrapper(
+            models.F('reserved_at') + payment_window, output_field=models.DateTimeField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_reservationdigestevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_expires_at, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='reservation',
+            name='reservation_status_time_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status', 'reserved')), fields=['expires_at'], name='reservation_expiry_idx'),
+        ),
+    ]
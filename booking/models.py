@@ -1,3 +1,5 @@
+import datetime
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -5,12 +7,17 @@ class Theater(models.Model):
     name = models.CharField(max_length=255)
     location = models.CharField(max_length=255)
     total_seats = models.IntegerField(default=0)
+    # Best-available scoring, e.g. {"sections": {"ORCH": 5}, "rows": {"F": 3}, "center": 2}
+    seat_preferences = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return f"Theater: {self.name} - Location: {self.location}"
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['location'], name='theater_location_idx'),
+        ]
 
 class Show(models.Model):
     theater = models.ForeignKey(Theater, related_name='shows', on_delete=models.CASCADE)
@@ -18,18 +25,49 @@ class Show(models.Model):
     description = models.TextField()
     date = models.DateField()
     time = models.TimeField()
+    # How long a new reservation may stay unpaid before the expiry sweep cancels it
+    payment_window = models.DurationField(default=datetime.timedelta(minutes=15))
+    # Key of settings.PRICING_CURVES; empty means fixed prices
+    pricing_curve = models.CharField(max_length=50, blank=True)
 
     class Meta:
         unique_together = ('theater', 'date', 'time')
         ordering = ['date', 'time']
+        indexes = [
+            models.Index(fields=['date', 'theater'], name='show_date_theater_idx'),
+        ]
 
     def __str__(self):
         return f"Show: {self.title} at {self.theater.name} on {self.date} at {self.time}"
 
+class PriceZone(models.Model):
+    theater = models.ForeignKey(Theater, related_name='price_zones', on_delete=models.CASCADE)
+    name = models.CharField(max_length=50)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        unique_together = ('theater', 'name')
+        ordering = ['name']
+
+    def __str__(self):
+        return f"Zone {self.name} in {self.theater.name}: {self.price}"
+
+class ShowPriceOverride(models.Model):
+    show = models.ForeignKey(Show, related_name='price_overrides', on_delete=models.CASCADE)
+    zone = models.ForeignKey(PriceZone, related_name='show_overrides', on_delete=models.CASCADE)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        unique_together = ('show', 'zone')
+
+    def __str__(self):
+        return f"{self.zone.name} at {self.price} for {self.show.title}"
+
 class Seat(models.Model):
     theater = models.ForeignKey(Theater, related_name='seats', on_delete=models.CASCADE)
     seat_number = models.CharField(max_length=10)
     is_reserved = models.BooleanField(default=False)
+    price_zone = models.ForeignKey(PriceZone, related_name='seats', null=True, blank=True, on_delete=models.SET_NULL)
 
     class Meta:
         unique_together = ('theater', 'seat_number')
@@ -60,14 +98,33 @@ class Reservation(models.Model):
     seat = models.ForeignKey(Seat, related_name='reservations', on_delete=models.CASCADE)
     reserved_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='reserved')
+    # When an unpaid reservation is cancelled: reserved_at plus the show's payment window
+    expires_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('show', 'seat')
         ordering = ['reserved_at']
+        indexes = [
+            models.Index(
+                fields=['expires_at'], condition=models.Q(status='reserved'), name='reservation_expiry_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Reservation by {self.user.username} for {self.show.title} on {self.show.date} at {self.show.time} - Status: {self.status}"
 
+class ShowOccupancy(models.Model):
+    """
+    Live reservation counters of a show, kept in step by booking.services
+    and rebuilt by the repair_occupancy command.
+    """
+    show = models.OneToOneField(Show, primary_key=True, related_name='occupancy', on_delete=models.CASCADE)
+    reserved = models.IntegerField(default=0)
+    paid = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Occupancy of {self.show_id}: {self.reserved} reserved, {self.paid} paid"
+
 class Ticket(models.Model):
     reservation = models.OneToOneField(Reservation, related_name='ticket', on_delete=models.CASCADE)
     ticket_number = models.CharField(max_length=50, unique=True)
@@ -77,4 +134,61 @@ class Ticket(models.Model):
         ordering = ['issued_at']
 
     def __str__(self):
-        return f"Ticket {self.ticket_number} for Reservation {self.reservation}"
\ No newline at end of file
+        return f"Ticket {self.ticket_number} for Reservation {self.reservation}"
+
+class TicketSequence(models.Model):
+    """
+    Counter from which booking.tickets reserves blocks of ticket numbers.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name}: next {self.next_value}"
+
+class BatchJobCheckpoint(models.Model):
+    """
+    Progress of a resumable batch job: the last primary key it finished,
+    committed together with each chunk of work.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Checkpoint {self.name}: {self.last_pk}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A Celery task to publish, written in the same transaction as the change
+    that caused it and sent later by the outbox relay.
+    """
+    task_name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['id'], condition=models.Q(published_at__isnull=True), name='outbox_unpublished_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Outbox event {self.id}: {self.task_name}"
+
+
+class ReservationDigestEvent(models.Model):
+    """
+    Reservations made for a show by one request, written in the request's
+    transaction and consumed by the next admin digest.
+    """
+    show = models.ForeignKey(Show, related_name='digest_events', on_delete=models.CASCADE)
+    reservations = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Digest event {self.id}: {self.reservations} reservations for {self.show_id}"
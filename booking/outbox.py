@@ -0,0 +1,69 @@
+"""
+Transactional outbox for side-effects of the reservation write path.
+
+Instead of publishing Celery tasks from the request, the write path stores
+them as ``OutboxEvent`` rows inside its own transaction: an event exists if
+and only if the reservation that caused it committed, and the request never
+waits on the broker. The relay (``manage.py relay_outbox``) drains pending
+events in primary-key order and publishes each batch over one producer
+connection. Delivery is at least once: an event can be published again if
+the relay dies between publishing and marking the batch, so tasks fed by the
+outbox must tolerate duplicates.
+"""
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+
+def event(task_name, *args, **kwargs):
+    """
+    An unsaved event that calls ``task_name`` with JSON-serialisable arguments.
+    """
+    return OutboxEvent(task_name=task_name, payload={'args': list(args), 'kwargs': kwargs})
+
+
+def enqueue(events):
+    """
+    Store ``events`` in the caller's transaction.
+    """
+    OutboxEvent.objects.bulk_create(events)
+
+
+def relay_batch(batch_size=None):
+    """
+    Publish up to ``batch_size`` pending events and mark them published,
+    returning how many were sent. Rows are claimed with ``SKIP LOCKED`` so
+    several relays can drain the outbox side by side.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(published_at__isnull=True)
+            .order_by('pk')[:batch_size]
+        )
+        if not events:
+            return 0
+        with current_app.producer_or_acquire() as producer:
+            for outbox_event in events:
+                current_app.send_task(
+                    outbox_event.task_name,
+                    args=outbox_event.payload.get('args', []),
+                    kwargs=outbox_event.payload.get('kwargs', {}),
+                    producer=producer,
+                )
+        OutboxEvent.objects.filter(pk__in=[outbox_event.pk for outbox_event in events]).update(
+            published_at=timezone.now()
+        )
+    return len(events)
+
+
+def purge_published(older_than):
+    """
+    Delete events published before ``older_than`` (a datetime).
+    """
+    deleted, _ = OutboxEvent.objects.filter(published_at__lt=older_than).delete()
+    return deleted
@@ -0,0 +1,140 @@
+"""
+Keyset (cursor) pagination for the catalog list endpoints.
+
+Pages are ordered by the model's ``Meta.ordering`` plus the primary key as a
+tie-breaker, and the cursor is the sort key of the last row served. Fetching
+the next page is a range condition on that key rather than an ``OFFSET``, so
+page 1,000 costs the same as page 1.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, value_getter=None):
+        # Reads a sort key from a page row; defaults to attribute access on
+        # model instances, ValuesSerializer supplies one for tuples.
+        self.value_getter = value_getter
+
+    def get_ordering(self, queryset):
+        ordering = [field for field in queryset.model._meta.ordering if not field.startswith('-')]
+        return ordering + ['pk']
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, values):
+        raw = json.dumps(values, cls=DjangoJSONEncoder).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def get_field(self, model, path):
+        for name in path.split('__'):
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            model = field.related_model
+        return field
+
+    def decode_cursor(self, request, model):
+        """
+        The sort key in the request's cursor, each value converted by its
+        ordering field; a cursor that does not decode to one valid value per
+        field is a 404 like any other unknown page.
+        """
+        cursor = request.GET.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None or isinstance(value, (dict, list)) for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [self.get_field(model, field).to_python(value) for field, value in zip(self.ordering, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def after(self, values):
+        """
+        ``(f1, f2, ..., pk) > (v1, v2, ..., vpk)`` as OR-ed equality prefixes.
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            prefix = Q(**{name: value for name, value in zip(self.ordering[:index], values)})
+            condition |= prefix & Q(**{f'{field}__gt': values[index]})
+        return condition
+
+    def page_queryset(self, queryset, request):
+        """
+        The rows of the requested page plus one, which tells whether there is
+        a next page. Async views evaluate it themselves and pass the rows to
+        ``set_page``.
+        """
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request, queryset.model)
+
+        queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self.after(self.cursor))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    def get_value(self, obj, field):
+        if self.value_getter is not None:
+            return self.value_getter(obj, field)
+        for name in field.split('__'):
+            obj = getattr(obj, name)
+        return obj
+
+    def get_next_cursor(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor([self.get_value(self.page[-1], field) for field in self.ordering])
+
+    @classmethod
+    def link_to(cls, request, cursor):
+        """
+        The URL of ``request`` with its cursor replaced by ``cursor``, or
+        ``None`` when there is no cursor (the last page).
+        """
+        if cursor is None:
+            return None
+        return replace_query_param(request.build_absolute_uri(), cls.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self.link_to(self.request, self.get_next_cursor())
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,164 @@
+"""
+Per-show seat prices.
+
+A seat's price for a show is the show's override for the seat's price zone,
+else the zone's price, else the seat's own ``SeatPricing`` row. Rather than
+resolving that chain per seat, each show's prices are flattened once into an
+array of cents indexed by layout position and cached under the versions of
+everything it was built from, so pricing a basket is a lookup per seat in
+that array and one sum.
+
+Shows with a ``pricing_curve`` (a key of ``settings.PRICING_CURVES``) are
+priced dynamically: each seat's price is multiplied by the step of the curve
+its zone's occupancy (or the show's, for seats without a zone) has reached.
+Occupancy is read from the show's availability bitmap, which reservations
+keep current, as a popcount of the bitmap masked by the zone's positions,
+so no aggregate query runs on the pricing path.
+"""
+from array import array
+from decimal import ROUND_HALF_UP, Decimal
+from operator import itemgetter
+
+from django.conf import settings
+
+from .availability import get_availability, theater_id_for_show
+from .cache import VersionedRead
+from .exceptions import SeatNotPriced
+from .layout import get_layout
+from .models import PriceZone, Seat, SeatPricing, Show, ShowPriceOverride
+
+UNPRICED = -1
+
+
+def to_cents(price):
+    return int(price * 100)
+
+
+def from_cents(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def position_bit(layout, position):
+    # Bit of ``position`` in the big-endian integer form of a bitmap.
+    return 1 << ((len(layout) + 7) // 8 * 8 - 1 - position)
+
+
+def build_prices(show_id, layout):
+    """
+    Resolve every seat of ``layout`` for ``show_id`` with four queries into a
+    dict of the ``cents`` array (``UNPRICED`` where there is none), the zone
+    of each position, a position bit mask per zone and the show's curve.
+    """
+    theater_id = layout.theater_id
+    cents = array('q', [UNPRICED]) * len(layout)
+    zones = array('q', [0]) * len(layout)
+    masks = {}
+    positions = layout.positions
+
+    for seat_id, price in SeatPricing.objects.filter(seat__theater_id=theater_id).values_list('seat_id', 'price'):
+        if seat_id in positions:
+            cents[positions[seat_id]] = to_cents(price)
+
+    zone_prices = dict(PriceZone.objects.filter(theater_id=theater_id).values_list('id', 'price'))
+    zone_prices.update(ShowPriceOverride.objects.filter(show_id=show_id).values_list('zone_id', 'price'))
+    zoned = Seat.objects.filter(theater_id=theater_id, price_zone__isnull=False).values_list('id', 'price_zone_id')
+    for seat_id, zone_id in zoned:
+        if seat_id in positions:
+            position = positions[seat_id]
+            cents[position] = to_cents(zone_prices[zone_id])
+            zones[position] = zone_id
+            masks[zone_id] = masks.get(zone_id, 0) | position_bit(layout, position)
+
+    curve = Show.objects.values_list('pricing_curve', flat=True).get(pk=show_id)
+    return {'cents': cents, 'zones': zones, 'masks': masks, 'curve': curve}
+
+
+def curve_multiplier(curve, occupancy):
+    """
+    The multiplier of the highest step of ``curve`` that ``occupancy``
+    (0 to 1) has reached, or 1.
+    """
+    multiplier = Decimal(1)
+    for threshold, step in sorted(curve):
+        if occupancy >= threshold:
+            multiplier = Decimal(str(step))
+    return multiplier
+
+
+class ShowPriceMap:
+    def __init__(self, show_id, layout, data):
+        self.show_id = show_id
+        self.layout = layout
+        self.cents = data['cents']
+        self.zones = data['zones']
+        self.masks = data['masks']
+        self.curve = settings.PRICING_CURVES.get(data['curve']) if data['curve'] else None
+        self._taken = None
+
+    def unknown_seats(self, seat_ids):
+        return [seat_id for seat_id in seat_ids if seat_id not in self.layout.positions]
+
+    @property
+    def taken(self):
+        # The availability bitmap as an integer, fetched on first use.
+        if self._taken is None:
+            size = (len(self.layout) + 7) // 8
+            bitmap = bytes(get_availability(self.show_id).bitmap[:size])
+            self._taken = int.from_bytes(bitmap.ljust(size, b'\0'), 'big')
+        return self._taken
+
+    def occupancy(self, zone_id=0):
+        """
+        Share of the reserved seats of a zone, or of the whole show.
+        """
+        if zone_id:
+            mask = self.masks[zone_id]
+            return (self.taken & mask).bit_count() / mask.bit_count()
+        return self.taken.bit_count() / len(self.layout) if len(self.layout) else 0.0
+
+    def quote(self, seat_ids):
+        """
+        Price ``seat_ids`` (all seats of the show's theater), returning
+        ``({seat_id: price}, total)``. Raises ``SeatNotPriced`` if any seat
+        has no price.
+        """
+        seat_ids = list(dict.fromkeys(seat_ids))
+        positions = [self.layout.positions[seat_id] for seat_id in seat_ids]
+        if len(positions) > 1:
+            cents = itemgetter(*positions)(self.cents)
+        else:
+            cents = tuple(self.cents[position] for position in positions)
+        unpriced = [seat_id for seat_id, price in zip(seat_ids, cents) if price == UNPRICED]
+        if unpriced:
+            raise SeatNotPriced(unpriced)
+        if self.curve:
+            cents = self.apply_curve(positions, cents)
+        prices = {seat_id: from_cents(price) for seat_id, price in zip(seat_ids, cents)}
+        return prices, from_cents(sum(cents))
+
+    def apply_curve(self, positions, cents):
+        multipliers = {}
+        adjusted = []
+        for position, price in zip(positions, cents):
+            zone_id = self.zones[position]
+            if zone_id not in multipliers:
+                multipliers[zone_id] = curve_multiplier(self.curve, self.occupancy(zone_id))
+            adjusted.append(int((price * multipliers[zone_id]).quantize(Decimal(1), ROUND_HALF_UP)))
+        return adjusted
+
+
+def get_price_map(show_id):
+    """
+    Return the cached price map of a show; raises ``Show.DoesNotExist``.
+    """
+    theater_id = theater_id_for_show(show_id)
+    layout = get_layout(theater_id)
+    dependencies = [
+        ('pricezone', theater_id), ('showprice', show_id), ('seat', theater_id), ('seatpricing', theater_id),
+        ('show', theater_id),
+    ]
+    data = VersionedRead(dependencies, ('price-map', show_id)).get_or_set(lambda: build_prices(show_id, layout))
+    if len(data['cents']) != len(layout):
+        # Built against another process's view of the layout.
+        data = build_prices(show_id, layout)
+    return ShowPriceMap(show_id, layout, data)
@@ -0,0 +1,145 @@
+"""
+Seat-state fan-out for the real-time seat map.
+
+Writers call ``publish(show_id, event)`` from any thread once a change has
+committed. With ``BOOKING_PUBSUB_BACKEND = 'redis'`` the event goes out as a
+Redis ``PUBLISH`` on ``seats:show:<id>``, so WSGI workers and Celery tasks
+reach every ASGI process. Each ASGI process holds a single pattern
+subscription and fans events out to its connections through the in-process
+``Hub``. With ``'memory'`` the event is handed to the local hub directly,
+which is enough when one process both writes and serves the push endpoints.
+
+Subscribers are bounded ``asyncio.Queue``s. A connection that falls too far
+behind is closed instead of buffering without limit; the client reconnects
+and starts again from a fresh snapshot.
+"""
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+
+from .kv import get_kv
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'seats:show:'
+QUEUE_SIZE = 256
+
+
+def channel(show_id):
+    return f'{CHANNEL_PREFIX}{show_id}'
+
+
+class Subscription:
+    def __init__(self, hub, show_id):
+        self.hub = hub
+        self.show_id = show_id
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.closed = False
+
+    def put(self, message):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.close()
+
+    async def get(self):
+        """
+        The next event as JSON text, or ``None`` once the subscription closed.
+        """
+        return await self.queue.get()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.hub.unsubscribe(self)
+        # Wake the reader; the sentinel may wait behind queued events.
+        while True:
+            try:
+                self.queue.put_nowait(None)
+                return
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+
+
+class Hub:
+    """
+    Subscribers of this process, by show. All methods except
+    ``publish_threadsafe`` must run on the hub's event loop.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.loop = None
+        self.listener = None
+
+    def subscribe(self, show_id):
+        self.loop = asyncio.get_running_loop()
+        if settings.BOOKING_PUBSUB_BACKEND == 'redis' and (self.listener is None or self.listener.done()):
+            self.listener = self.loop.create_task(self.listen())
+        subscription = Subscription(self, show_id)
+        self.subscribers.setdefault(show_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self.subscribers.get(subscription.show_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[subscription.show_id]
+
+    def deliver(self, show_id, message):
+        for subscription in list(self.subscribers.get(show_id, ())):
+            subscription.put(message)
+
+    def publish_threadsafe(self, show_id, message):
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.deliver, show_id, message)
+
+    async def listen(self):
+        # One pattern subscription per process, re-established with backoff.
+        import redis.asyncio
+
+        delay = 1
+        while True:
+            client = redis.asyncio.Redis.from_url(settings.REDIS_DB_URL)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+                    delay = 1
+                    async for message in pubsub.listen():
+                        if message['type'] != 'pmessage':
+                            continue
+                        show_id = int(message['channel'][len(CHANNEL_PREFIX):])
+                        self.deliver(show_id, message['data'].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Seat event subscription lost; reconnecting in %s s', delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                await client.aclose()
+
+
+hub = Hub()
+
+
+def publish(show_id, event):
+    """
+    Send ``event`` (a JSON-serialisable dict) to every subscriber of the show.
+    """
+    message = json.dumps({'show': show_id, **event})
+    if settings.BOOKING_PUBSUB_BACKEND == 'redis':
+        try:
+            get_kv().publish(channel(show_id), message)
+        except Exception:
+            # Push is best effort; the seat map still polls as a fallback.
+            logger.exception('Could not publish seat event for show %s', show_id)
+    else:
+        hub.publish_threadsafe(show_id, message)
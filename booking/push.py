@@ -0,0 +1,199 @@
+"""
+ASGI endpoints pushing seat-map changes to browsers.
+
+    GET /api/shows/<id>/events?ticket=<stream ticket>    Server-Sent Events
+    WS  /ws/shows/<id>/seats?ticket=<stream ticket>      WebSocket
+
+Browsers cannot set an Authorization header on either, and query strings end
+up in access logs, so connections authenticate with a stream ticket instead
+of the access token: a random string issued by ``POST
+/api/shows/<id>/stream-ticket``, bound to the user and show, valid for
+``STREAM_TICKET_TTL`` seconds and consumed by the first connection using it.
+
+Both start with a ``snapshot`` event (taken and held seat ids) followed by
+deltas from ``booking.pubsub``: ``seats`` (``taken``/``released``), ``hold``
+(``seat``, ``expires_at``) and ``unhold`` (``seat``). Holds also lapse on
+their own at ``expires_at`` without an event. The subscription is opened
+before the snapshot is read, so no change falls between the two. An idle
+connection costs one queue and one waiting coroutine, so a single worker
+can keep tens of thousands open.
+"""
+import asyncio
+import json
+import re
+import secrets
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+
+from . import holds
+from .availability import get_availability
+from .kv import Script, get_kv
+from .models import Show
+from .pubsub import hub
+
+SSE_PATH = re.compile(r'^/api/shows/(?P<show_id>\d+)/events/?$')
+WEBSOCKET_PATH = re.compile(r'^/ws/shows/(?P<show_id>\d+)/seats/?$')
+# Seconds between SSE comments that keep proxies from closing idle streams
+HEARTBEAT_INTERVAL = 20
+# Seconds a stream ticket stays valid before it is used
+STREAM_TICKET_TTL = 30
+
+
+def _take(kv, keys, args):
+    value = kv.get(keys[0])
+    if value is not None:
+        kv.delete(keys[0])
+    return value
+
+
+# GET and DEL in one step, so a ticket opens one connection at most.
+TAKE_TICKET = Script("""
+local value = redis.call('GET', KEYS[1])
+if value then
+    redis.call('DEL', KEYS[1])
+end
+return value
+""", _take)
+
+
+def stream_ticket_key(ticket):
+    return f'stream-ticket:{ticket}'
+
+
+def issue_stream_ticket(user_id, show_id):
+    """
+    A new single-use ticket letting ``user_id`` open one push connection
+    for ``show_id`` within ``STREAM_TICKET_TTL`` seconds.
+    """
+    ticket = secrets.token_urlsafe(32)
+    get_kv().set(stream_ticket_key(ticket), f'{user_id}:{show_id}', ex=STREAM_TICKET_TTL)
+    return ticket
+
+
+def redeem_stream_ticket(ticket, show_id):
+    """
+    Consume ``ticket`` and return the id of the user it was issued to, or
+    ``None`` if it is unknown, expired, used or issued for another show.
+    """
+    if not ticket:
+        return None
+    value = TAKE_TICKET(keys=[stream_ticket_key(ticket)])
+    if value is None:
+        return None
+    user_id, ticket_show_id = value.decode().split(':')
+    return int(user_id) if int(ticket_show_id) == show_id else None
+
+
+async def authenticate(scope, show_id):
+    ticket = parse_qs(scope.get('query_string', b'').decode()).get('ticket', [''])[0]
+    return await sync_to_async(redeem_stream_ticket)(ticket, show_id)
+
+
+def snapshot(show_id):
+    """
+    The current taken and held seats of a show; raises ``Show.DoesNotExist``.
+    """
+    return json.dumps({
+        'show': show_id,
+        'type': 'snapshot',
+        'taken': get_availability(show_id).taken_seat_ids(),
+        'held': holds.held_seat_ids(show_id),
+    })
+
+
+async def send_json_response(send, status, message):
+    body = json.dumps({'message': message}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def close_on_disconnect(receive, subscription, disconnect_type):
+    while True:
+        message = await receive()
+        if message['type'] == disconnect_type:
+            subscription.close()
+            return
+
+
+async def server_sent_events(scope, receive, send, show_id):
+    if await authenticate(scope, show_id) is None:
+        return await send_json_response(send, 401, 'A valid stream ticket is required')
+    subscription = hub.subscribe(show_id)
+    watcher = asyncio.ensure_future(close_on_disconnect(receive, subscription, 'http.disconnect'))
+    try:
+        try:
+            initial = await sync_to_async(snapshot)(show_id)
+        except Show.DoesNotExist:
+            return await send_json_response(send, 404, 'Show not found')
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        message = initial
+        while message is not None:
+            await send({'type': 'http.response.body', 'body': f'data: {message}\n\n'.encode(), 'more_body': True})
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), HEARTBEAT_INTERVAL)
+                    break
+                except asyncio.TimeoutError:
+                    await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+        if not watcher.done():
+            # Dropped for falling behind; end the response so the client reconnects.
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        subscription.close()
+        watcher.cancel()
+
+
+async def websocket(scope, receive, send, show_id):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    if await authenticate(scope, show_id) is None:
+        return await send({'type': 'websocket.close', 'code': 4401})
+    subscription = hub.subscribe(show_id)
+    watcher = asyncio.ensure_future(close_on_disconnect(receive, subscription, 'websocket.disconnect'))
+    try:
+        try:
+            message = await sync_to_async(snapshot)(show_id)
+        except Show.DoesNotExist:
+            return await send({'type': 'websocket.close', 'code': 4404})
+        await send({'type': 'websocket.accept'})
+        while message is not None:
+            await send({'type': 'websocket.send', 'text': message})
+            message = await subscription.get()
+        if not watcher.done():
+            await send({'type': 'websocket.close', 'code': 1013})
+    finally:
+        subscription.close()
+        watcher.cancel()
+
+
+def router(django_application):
+    """
+    Wrap the Django ASGI application, serving the push endpoints in front of it.
+    """
+    async def application(scope, receive, send):
+        if scope['type'] == 'http':
+            match = SSE_PATH.match(scope['path'])
+            if match and scope['method'] == 'GET':
+                return await server_sent_events(scope, receive, send, int(match['show_id']))
+        elif scope['type'] == 'websocket':
+            match = WEBSOCKET_PATH.match(scope['path'])
+            if match:
+                return await websocket(scope, receive, send, int(match['show_id']))
+            await receive()
+            return await send({'type': 'websocket.close', 'code': 4404})
+        return await django_application(scope, receive, send)
+
+    return application
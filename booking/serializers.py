@@ -1,6 +1,7 @@
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Theater, Show, Seat, Reservation, Ticket
+from .models import Theater, Show, Seat, SeatPricing, Reservation, Ticket
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -32,12 +33,128 @@ class SeatSerializer(serializers.ModelSerializer):
         model = Seat
         fields = '__all__'
 
+class SeatPricingSerializer(serializers.ModelSerializer):
+    seat_number = serializers.CharField(source='seat.seat_number', read_only=True)
+
+    class Meta:
+        model = SeatPricing
+        fields = '__all__'
+
 class ReservationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reservation
         fields = '__all__'
 
+class ReservationCreateSerializer(serializers.Serializer):
+    show = serializers.PrimaryKeyRelatedField(queryset=Show.objects.all())
+    seat = serializers.PrimaryKeyRelatedField(queryset=Seat.objects.all())
+
+    def validate(self, attrs):
+        if attrs['seat'].theater_id != attrs['show'].theater_id:
+            raise serializers.ValidationError({'seat': 'Seat does not belong to the theater of this show.'})
+        return attrs
+
+class ReservationBatchCreateSerializer(serializers.Serializer):
+    show = serializers.PrimaryKeyRelatedField(queryset=Show.objects.all())
+    seats = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=20)
+
+    def validate(self, attrs):
+        seat_ids = set(attrs['seats'])
+        found = set(
+            Seat.objects.filter(pk__in=seat_ids, theater_id=attrs['show'].theater_id).values_list('pk', flat=True)
+        )
+        missing = sorted(seat_ids - found)
+        if missing:
+            raise serializers.ValidationError(
+                {'seats': f'Seats not found in the theater of this show: {", ".join(map(str, missing))}'}
+            )
+        return attrs
+
+class ReservationPaySerializer(serializers.Serializer):
+    reservations = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=500)
+
+class QuoteSerializer(serializers.Serializer):
+    seats = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=500)
+
 class TicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = '__all__'
+
+class TicketIssueSerializer(serializers.Serializer):
+    reservations = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=500)
+
+class ValuesSerializer:
+    """
+    Read-only fast path for listings. Reproduces the output of
+    ``model_serializer_class`` field for field, but from ``values_list()``
+    tuples: no model instances are built, and only fields whose
+    representation differs from the database value (dates, times, decimals)
+    go through a converter, compiled once per class.
+    """
+    model_serializer_class = None
+    # Field types whose database value already is the representation.
+    passthrough_fields = (
+        serializers.BooleanField, serializers.CharField, serializers.IntegerField,
+        serializers.JSONField, serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, instance=None, many=False):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def compile(cls):
+        if '_names' in cls.__dict__:
+            return
+        names, sources, converters = [], [], []
+        for name, field in cls.model_serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if '.' in field.source or field.source == '*':
+                raise ImproperlyConfigured(f'{cls.__name__} cannot read {name!r} from values_list()')
+            names.append(name)
+            sources.append(field.source)
+            if not isinstance(field, cls.passthrough_fields):
+                converters.append((len(names) - 1, name, field.to_representation))
+        cls._names = tuple(names)
+        cls._sources = tuple(sources)
+        cls._converters = tuple(converters)
+        cls._positions = {source: index for index, source in enumerate(sources)}
+        cls._positions.setdefault('pk', cls._positions.get('id'))
+
+    @classmethod
+    def prepare_queryset(cls, queryset):
+        cls.compile()
+        return queryset.values_list(*cls._sources)
+
+    @classmethod
+    def cursor_value(cls, row, field):
+        cls.compile()
+        return row[cls._positions[field]]
+
+    @classmethod
+    def to_dict(cls, row):
+        data = dict(zip(cls._names, row))
+        for index, name, convert in cls._converters:
+            value = row[index]
+            if value is not None:
+                data[name] = convert(value)
+        return data
+
+    @property
+    def data(self):
+        self.compile()
+        if self.many:
+            to_dict = self.to_dict
+            return [to_dict(row) for row in self.instance]
+        return self.to_dict(self.instance)
+
+class TheaterListSerializer(ValuesSerializer):
+    model_serializer_class = TheaterSerializer
+
+class ShowListSerializer(ValuesSerializer):
+    model_serializer_class = ShowSerializer
+
+class SeatListSerializer(ValuesSerializer):
+    model_serializer_class = SeatSerializer
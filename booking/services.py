@@ -0,0 +1,241 @@
+"""
+Reservation write path.
+
+Seats are claimed under row locks on the ``Seat`` rows so concurrent buyers
+of the same seat queue on the lock instead of racing to the
+``unique_together('show', 'seat')`` constraint. Losers get ``SeatTaken``,
+which views turn into a 409 response; a set bit in the availability bitmap,
+confirmed with one indexed read, rejects them before any lock is taken.
+Side-effects (outbox
+emails, admin digest events) are written in the same transaction, and every
+status change adjusts the show's ``ShowOccupancy`` counters with it.
+Paying issues the reservations' tickets; cancelling voids them.
+"""
+from itertools import groupby
+from operator import itemgetter
+
+from celery import current_app
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import holds, outbox
+from .availability import confirm_taken, get_availability, mark_seats
+from .exceptions import HoldExpired, SeatTaken
+from .kv import get_kv
+from .models import Reservation, ReservationDigestEvent, Seat, ShowOccupancy, Ticket
+from .signals import notify_seats_changed
+from .tickets import issue_tickets
+
+RESERVATION_DIGEST_PENDING_KEY = 'reservation_digest:pending'
+
+
+def reserve_seat(user, show, seat, status='reserved'):
+    """
+    Claim ``seat`` for ``show`` on behalf of ``user`` or raise ``SeatTaken``.
+    """
+    return reserve_seats(user, show, [seat.id], status=status)[0]
+
+
+def reserve_seats(user, show, seat_ids, status='reserved'):
+    """
+    Claim every seat in ``seat_ids`` for ``show`` all-or-nothing, returning
+    the reservations ordered by seat id. Any seat that is taken or held by
+    another user fails the whole batch with ``SeatTaken`` listing the
+    offending seats. Cancelled reservations for the requested seats are
+    reused in place; the rest are written with one bulk insert.
+    """
+    seat_ids = sorted(set(seat_ids))
+    availability = get_availability(show.id)
+    # The bitmap answers most requests; its hits are confirmed in the
+    # database so a stale bit cannot refuse a free seat.
+    unavailable = confirm_taken(show.id, [seat_id for seat_id in seat_ids if availability.is_taken(seat_id)])
+    unavailable += [
+        seat_id for seat_id, holder in holds.get_holders(show.id, seat_ids).items()
+        if holder not in (None, user.id)
+    ]
+    if unavailable:
+        raise SeatTaken(sorted(set(unavailable)))
+
+    with transaction.atomic():
+        # Lock in primary key order so overlapping batches cannot deadlock.
+        list(
+            Seat.objects.select_for_update()
+            .filter(pk__in=seat_ids)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        existing = {
+            reservation.seat_id: reservation
+            for reservation in Reservation.objects.filter(show=show, seat_id__in=seat_ids).order_by()
+        }
+        conflicts = [seat_id for seat_id, reservation in existing.items() if reservation.status != 'cancelled']
+        if conflicts:
+            # Taken in the database but free in the bitmap: set the lost bits.
+            mark_seats(show.id, conflicts, True)
+            raise SeatTaken(sorted(conflicts))
+
+        now = timezone.now()
+        expires_at = now + show.payment_window if status == 'reserved' else None
+        reused = list(existing.values())
+        for reservation in reused:
+            reservation.user = user
+            reservation.status = status
+            reservation.reserved_at = now
+            reservation.expires_at = expires_at
+        if reused:
+            Reservation.objects.bulk_update(reused, ['user', 'status', 'reserved_at', 'expires_at'])
+
+        created = [
+            Reservation(user=user, show=show, seat_id=seat_id, status=status, expires_at=expires_at)
+            for seat_id in seat_ids if seat_id not in existing
+        ]
+        try:
+            # Backends without row locks (SQLite) can still race to the
+            # insert; the savepoint turns the loser's IntegrityError into
+            # SeatTaken without aborting the outer transaction.
+            with transaction.atomic():
+                Reservation.objects.bulk_create(created)
+        except IntegrityError:
+            raise SeatTaken([reservation.seat_id for reservation in created])
+
+        # bulk_create and bulk_update skip post_save, so announce the seats here.
+        notify_seats_changed(show.id, taken=seat_ids)
+
+        reservations = sorted(reused + created, key=lambda reservation: reservation.seat_id)
+        ReservationDigestEvent.objects.create(show=show, reservations=len(reservations))
+        transaction.on_commit(lambda: note_new_reservations(len(reservations)), robust=True)
+        if status == 'paid':
+            outbox.enqueue([
+                outbox.event('booking.tasks.send_payment_confirmation', reservation.id)
+                for reservation in reservations
+            ])
+            issue_tickets([reservation.id for reservation in reservations])
+        # Last, so the show's counter row stays locked only until commit.
+        adjust_occupancy(show.id, **{status: len(seat_ids)})
+
+    return reservations
+
+
+def note_new_reservations(count):
+    """
+    Count reservations waiting for the admin digest, after commit, and start
+    the digest early once ``RESERVATION_DIGEST_MAX_EVENTS`` are waiting. The
+    counter only decides when to send; the digest itself reads the
+    ``ReservationDigestEvent`` rows.
+    """
+    pending = get_kv().incr(RESERVATION_DIGEST_PENDING_KEY, count)
+    if pending - count < settings.RESERVATION_DIGEST_MAX_EVENTS <= pending:
+        current_app.send_task('booking.tasks.send_reservation_digest')
+
+
+def count_occupancy(show_id):
+    """
+    Count a show's reservations per status from scratch.
+    """
+    counts = dict(
+        Reservation.objects.filter(show_id=show_id).exclude(status='cancelled').order_by()
+        .values_list('status').annotate(total=Count('id'))
+    )
+    return {'reserved': counts.get('reserved', 0), 'paid': counts.get('paid', 0)}
+
+
+def adjust_occupancy(show_id, **deltas):
+    """
+    Add ``deltas`` (``reserved``/``paid`` changes) to a show's counters in the
+    current transaction, after the reservations themselves were written. A
+    show without a counter row yet gets one counted from scratch, which
+    already includes those writes; if another transaction created the row
+    first, the deltas are added to its counts instead of replacing them.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes or ShowOccupancy.objects.filter(show_id=show_id).update(**changes):
+        return
+    _, created = ShowOccupancy.objects.get_or_create(show_id=show_id, defaults=count_occupancy(show_id))
+    if not created:
+        ShowOccupancy.objects.filter(show_id=show_id).update(**changes)
+
+
+def _apply_status(rows, status):
+    # ``rows`` are locked ``(pk, show_id, seat_id, old_status)`` tuples.
+    Reservation.objects.filter(pk__in=[pk for pk, _, _, _ in rows]).update(status=status)
+    for show_id, show_rows in groupby(sorted(rows, key=itemgetter(1)), key=itemgetter(1)):
+        show_rows = list(show_rows)
+        deltas = {}
+        for _, _, _, old_status in show_rows:
+            deltas[old_status] = deltas.get(old_status, 0) - 1
+        if status == 'cancelled':
+            # update() skips post_save, so announce the freed seats here.
+            notify_seats_changed(show_id, released=[seat_id for _, _, seat_id, _ in show_rows])
+        else:
+            deltas[status] = deltas.get(status, 0) + len(show_rows)
+        adjust_occupancy(show_id, **deltas)
+    if status == 'paid':
+        issue_tickets([pk for pk, _, _, _ in rows])
+        outbox.enqueue([outbox.event('booking.tasks.send_payment_confirmation', pk) for pk, _, _, _ in rows])
+    elif status == 'cancelled':
+        # The reservation row may be sold again; its old ticket must not come with it.
+        Ticket.objects.filter(reservation_id__in=[pk for pk, _, _, _ in rows]).delete()
+
+
+def set_reservation_status(reservation_ids, status, from_statuses):
+    """
+    Move the reservations among ``reservation_ids`` currently in one of
+    ``from_statuses`` to ``status``, returning how many changed.
+    """
+    with transaction.atomic():
+        rows = list(
+            Reservation.objects.select_for_update()
+            .filter(pk__in=reservation_ids, status__in=from_statuses)
+            .order_by('pk')
+            .values_list('pk', 'show_id', 'seat_id', 'status')
+        )
+        if rows:
+            _apply_status(rows, status)
+    return len(rows)
+
+
+def pay_reservations(reservation_ids):
+    """
+    Mark unpaid reservations as paid, returning how many changed.
+    """
+    return set_reservation_status(reservation_ids, 'paid', from_statuses=('reserved',))
+
+
+def cancel_reservations(reservation_ids):
+    """
+    Cancel reservations and free their seats, returning how many changed.
+    """
+    return set_reservation_status(reservation_ids, 'cancelled', from_statuses=('reserved', 'paid'))
+
+
+def expire_reservations(now, limit):
+    """
+    Cancel up to ``limit`` unpaid reservations whose ``expires_at`` has
+    passed and free their seats, returning how many were cancelled. Rows are
+    read from the partial index on unpaid reservations' ``expires_at``, so a
+    sweep touches only expired rows, and locked with ``SKIP LOCKED`` so a
+    reservation being paid for right now is left to its buyer.
+    """
+    with transaction.atomic():
+        expired = list(
+            Reservation.objects.select_for_update(skip_locked=True)
+            .filter(status='reserved', expires_at__lt=now)
+            .order_by('expires_at')
+            .values_list('pk', 'show_id', 'seat_id', 'status')[:limit]
+        )
+        if expired:
+            _apply_status(expired, 'cancelled')
+    return len(expired)
+
+
+def confirm_hold(show, seat, user):
+    """
+    Upgrade the user's hold to a paid ``Reservation`` once payment succeeds.
+    """
+    if holds.get_holder(show.id, seat.id) != user.id:
+        raise HoldExpired()
+    reservation = reserve_seat(user, show, seat, status='paid')
+    holds.release_hold(show.id, seat.id, user.id)
+    return reservation
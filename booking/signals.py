@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import availability, pubsub
+from .cache import bump_version
+from .layout import invalidate_layout
+from .models import PriceZone, Reservation, Seat, SeatPricing, Show, ShowOccupancy, ShowPriceOverride, Theater
+
+# Sent after commit whenever seats of a show are taken or released, with
+# ``show_id``, ``taken`` and ``released`` (tuples of seat ids) as kwargs.
+seats_changed = Signal()
+
+
+def notify_seats_changed(show_id, taken=(), released=()):
+    """
+    Send ``seats_changed`` once the current transaction commits, so rolled
+    back writes never reach the availability bitmaps.
+    """
+    taken, released = tuple(taken), tuple(released)
+    transaction.on_commit(
+        lambda: seats_changed.send(sender=Reservation, show_id=show_id, taken=taken, released=released),
+        robust=True,
+    )
+
+
+@receiver(post_save, sender=Reservation)
+def reservation_saved(sender, instance, **kwargs):
+    if instance.status == 'cancelled':
+        notify_seats_changed(instance.show_id, released=[instance.seat_id])
+    else:
+        notify_seats_changed(instance.show_id, taken=[instance.seat_id])
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_deleted(sender, instance, **kwargs):
+    notify_seats_changed(instance.show_id, released=[instance.seat_id])
+
+
+@receiver(seats_changed)
+def update_availability(sender, show_id, taken=(), released=(), **kwargs):
+    if taken:
+        availability.mark_seats(show_id, taken, True)
+    if released:
+        availability.mark_seats(show_id, released, False)
+    bump_version('availability', show_id)
+    pubsub.publish(show_id, {'type': 'seats', 'taken': list(taken), 'released': list(released)})
+
+
+def layout_changed(theater_id):
+    # Every process reloads the theater's layout once the change commits;
+    # positions after a deleted seat shift, so bitmaps are rebuilt as well.
+    invalidate_layout(theater_id)
+    transaction.on_commit(lambda: availability.advance_layout(theater_id), robust=True)
+
+
+def seats_bulk_created(theater_id):
+    """
+    Stand-in for ``post_save`` after ``Seat.objects.bulk_create``.
+    """
+    layout_changed(theater_id)
+    bump_version('seat', theater_id)
+
+
+@receiver(post_save, sender=Seat)
+def seat_saved(sender, instance, **kwargs):
+    layout_changed(instance.theater_id)
+    bump_version('seat', instance.theater_id)
+
+
+@receiver(post_delete, sender=Seat)
+def seat_deleted(sender, instance, **kwargs):
+    layout_changed(instance.theater_id)
+    bump_version('seat', instance.theater_id)
+
+
+@receiver(post_save, sender=Theater)
+def theater_changed(sender, instance, **kwargs):
+    # Seat preferences feed the layout's best-available scores.
+    layout_changed(instance.pk)
+    bump_version('theater')
+
+
+@receiver(post_delete, sender=Theater)
+def theater_deleted(sender, instance, **kwargs):
+    invalidate_layout(instance.pk)
+    bump_version('theater')
+
+
+@receiver(post_save, sender=Show)
+@receiver(post_delete, sender=Show)
+def show_changed(sender, instance, **kwargs):
+    bump_version('show', instance.theater_id)
+
+
+@receiver(post_save, sender=Show)
+def show_created(sender, instance, created, raw=False, **kwargs):
+    # Reservations only adjust the counters; bulk-created shows get theirs
+    # on first use or from repair_occupancy.
+    if created and not raw:
+        ShowOccupancy.objects.get_or_create(show=instance)
+
+
+@receiver(post_save, sender=SeatPricing)
+@receiver(post_delete, sender=SeatPricing)
+def seat_pricing_changed(sender, instance, **kwargs):
+    # Pricing listings also depend on the seat version, which covers rows
+    # removed by a seat delete cascading here.
+    theater_id = Seat.objects.filter(pk=instance.seat_id).values_list('theater_id', flat=True).first()
+    bump_version('seatpricing', theater_id)
+
+
+@receiver(post_save, sender=PriceZone)
+@receiver(post_delete, sender=PriceZone)
+def price_zone_changed(sender, instance, **kwargs):
+    # Deleting a zone also clears Seat.price_zone without seat signals.
+    bump_version('pricezone', instance.theater_id)
+
+
+@receiver(post_save, sender=ShowPriceOverride)
+@receiver(post_delete, sender=ShowPriceOverride)
+def show_price_override_changed(sender, instance, **kwargs):
+    bump_version('showprice', instance.show_id)
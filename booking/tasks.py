@@ -1,9 +1,26 @@
+import csv
+import gzip
+import os
+import tempfile
+from itertools import groupby
+from operator import itemgetter
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import transaction
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
-from .models import Reservation
+from .artifacts import load_ticket, store_artifact
+from .kv import get_kv
+from .models import BatchJobCheckpoint, Reservation, ReservationDigestEvent
+from .services import RESERVATION_DIGEST_PENDING_KEY, expire_reservations
 from django.contrib.auth.models import User
 
+# Events summarised per digest; the rest wait for the next one.
+RESERVATION_DIGEST_EVENT_LIMIT = 10_000
+
+
 @shared_task
 def send_welcome_email(user_id):
     """
@@ -20,15 +37,37 @@ def send_welcome_email(user_id):
 
 
 @shared_task
-def deactivate_inactive_accounts():
+def deactivate_inactive_accounts(batch_size=None):
     """
     Deactivate accounts that have been inactive for more than a year.
+
+    Users are deactivated in primary-key order, one short transaction per
+    chunk, and the last primary key of each chunk is committed with it to a
+    BatchJobCheckpoint. A killed worker resumes after the last committed
+    chunk; a run that reaches the end resets the checkpoint for the next day.
     """
+    batch_size = batch_size or settings.DEACTIVATION_BATCH_SIZE
     one_year_ago = timezone.now() - timezone.timedelta(days=365)
-    inactive_users = User.objects.filter(last_login__lt=one_year_ago, is_active=True)
-    
-    count = inactive_users.count()
-    inactive_users.update(is_active=False)
+    BatchJobCheckpoint.objects.get_or_create(name='deactivate_inactive_accounts')
+
+    count = 0
+    while True:
+        with transaction.atomic():
+            # The locked checkpoint also keeps two overlapping runs from
+            # processing the same chunk.
+            checkpoint = BatchJobCheckpoint.objects.select_for_update().get(name='deactivate_inactive_accounts')
+            user_ids = list(
+                User.objects.filter(pk__gt=checkpoint.last_pk, last_login__lt=one_year_ago, is_active=True)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                checkpoint.last_pk = 0
+                checkpoint.save(update_fields=['last_pk', 'updated_at'])
+                break
+            count += User.objects.filter(pk__in=user_ids, is_active=True).update(is_active=False)
+            checkpoint.last_pk = user_ids[-1]
+            checkpoint.save(update_fields=['last_pk', 'updated_at'])
     return f'Deactivated {count} inactive accounts'
 
 @shared_task
@@ -50,39 +89,149 @@ def notify_user_of_new_device_login(user_id, device_info):
 def send_show_reminder():
     """
     Send reminder emails to users who have reservations for shows happening the next day.
+
+    Reservations are streamed with their user, show and seat joined in,
+    grouped into one email per user, and fanned out to
+    ``send_show_reminder_batch`` subtasks of ``REMINDER_BATCH_SIZE`` users.
     """
     tomorrow = timezone.now().date() + timezone.timedelta(days=1)
-    reservations = Reservation.objects.filter(show__date=tomorrow, status='reserved')
-    
-    for reservation in reservations:
-        send_mail(
-            subject=f'Reminder: Your reservation for {reservation.show.title} is tomorrow!',
-            message=f'Hello {reservation.user.username},\n\nThis is a reminder that you have a reservation for the show "{reservation.show.title}" at {reservation.show.time} on {reservation.show.date}.',
-            from_email='noreply@theater.com',
-            recipient_list=[reservation.user.email],
+    rows = (
+        Reservation.objects.filter(show__date=tomorrow, status__in=('reserved', 'paid'))
+        .order_by('user_id', 'show__time', 'pk')
+        .values_list(
+            'user_id', 'user__username', 'user__email',
+            'show__title', 'show__date', 'show__time', 'seat__seat_number',
         )
-    return f'Sent reminders for {reservations.count()} reservations'
+        .iterator(chunk_size=2000)
+    )
+
+    batch = []
+    batches = reservations = 0
+    for _, user_rows in groupby(rows, key=itemgetter(0)):
+        user_rows = list(user_rows)
+        reservations += len(user_rows)
+        batch.append({
+            'username': user_rows[0][1],
+            'email': user_rows[0][2],
+            'reservations': [
+                {'title': title, 'date': str(date), 'time': str(time), 'seat_number': seat_number}
+                for _, _, _, title, date, time, seat_number in user_rows
+            ],
+        })
+        if len(batch) >= settings.REMINDER_BATCH_SIZE:
+            send_show_reminder_batch.delay(batch)
+            batches += 1
+            batch = []
+    if batch:
+        send_show_reminder_batch.delay(batch)
+        batches += 1
+    return f'Queued reminders for {reservations} reservations in {batches} batches'
+
+@shared_task
+def send_show_reminder_batch(recipients):
+    """
+    Send one reminder per recipient over a single SMTP connection.
+    """
+    messages = []
+    for recipient in recipients:
+        lines = [
+            f'the show "{reservation["title"]}" at {reservation["time"]} on {reservation["date"]} (seat {reservation["seat_number"]})'
+            for reservation in recipient['reservations']
+        ]
+        if len(lines) == 1:
+            subject = f'Reminder: Your reservation for {recipient["reservations"][0]["title"]} is tomorrow!'
+            body = f'This is a reminder that you have a reservation for {lines[0]}.'
+        else:
+            subject = 'Reminder: Your reservations are tomorrow!'
+            body = 'This is a reminder that you have reservations for:\n\n' + '\n'.join(f'- {line}' for line in lines)
+        messages.append(EmailMessage(
+            subject=subject,
+            body=f'Hello {recipient["username"]},\n\n{body}',
+            from_email='noreply@theater.com',
+            to=[recipient['email']],
+        ))
+    with get_connection() as connection:
+        sent = connection.send_messages(messages)
+    return f'Sent {sent} reminders'
 
 @shared_task
 def generate_daily_report():
     """
     Generate and email a daily report of reservations.
+
+    Totals per status and per show are aggregated in the database. The
+    row-level listing is streamed from a server-side cursor into a gzipped
+    CSV file on disk that is attached to the email, so building the report
+    never holds more than one chunk of reservations in memory, and only the
+    compressed file is read back when the message is sent.
     """
     today = timezone.now().date()
-    reservations = Reservation.objects.filter(show__date=today)
-    
-    report_content = f'Daily Report for {today}\n\nTotal Reservations: {reservations.count()}\n\n'
-    for reservation in reservations:
-        report_content += f'Reservation ID: {reservation.id}, User: {reservation.user.username}, Show: {reservation.show.title}, Seat: {reservation.seat.seat_number}, Status: {reservation.status}\n'
-    
-    send_mail(
+    reservations = Reservation.objects.filter(show__date=today).order_by()
+
+    status_totals = dict(reservations.values_list('status').annotate(total=Count('id')))
+    show_totals = (
+        reservations.values('show', 'show__title', 'show__theater__name', 'show__time')
+        .annotate(
+            total=Count('id'),
+            **{status: Count('id', filter=Q(status=status)) for status, _ in Reservation.STATUS_CHOICES},
+        )
+        .order_by('show__time', 'show__theater__name', 'show')
+    )
+
+    lines = [
+        f'Daily Report for {today}',
+        '',
+        f'Total Reservations: {sum(status_totals.values())}',
+    ]
+    lines += [f'{label}: {status_totals.get(status, 0)}' for status, label in Reservation.STATUS_CHOICES]
+    lines += ['', 'Per show:']
+    for show in show_totals:
+        counts = ', '.join(f'{label} {show[status]}' for status, label in Reservation.STATUS_CHOICES)
+        lines.append(
+            f'{show["show__title"]} at {show["show__theater__name"]}, {show["show__time"]}: '
+            f'{show["total"]} ({counts})'
+        )
+    lines += ['', 'The full list of reservations is attached as gzipped CSV.']
+
+    message = EmailMessage(
         subject=f'Daily Report for {today}',
-        message=report_content,
+        body='\n'.join(lines),
         from_email='noreply@theater.com',
-        recipient_list=['admin@theater.com'],
+        to=['admin@theater.com'],
     )
+    with tempfile.TemporaryDirectory() as report_dir:
+        report_path = os.path.join(report_dir, f'reservations-{today}.csv.gz')
+        with gzip.open(report_path, 'wt', newline='') as report_file:
+            writer = csv.writer(report_file)
+            writer.writerow(['Reservation ID', 'User', 'Show', 'Theater', 'Show Time', 'Seat', 'Status'])
+            rows = (
+                reservations.order_by('pk')
+                .values_list(
+                    'id', 'user__username', 'show__title', 'show__theater__name', 'show__time',
+                    'seat__seat_number', 'status',
+                )
+                .iterator(chunk_size=2000)
+            )
+            writer.writerows(rows)
+        message.attach_file(report_path, 'application/gzip')
+        message.send()
     return f'Sent daily report for {today}'
 
+@shared_task
+def expire_unpaid_reservations(batch_size=None):
+    """
+    Cancel reservations that were not paid within their show's payment
+    window, one batch per transaction.
+    """
+    batch_size = batch_size or settings.RESERVATION_EXPIRY_BATCH_SIZE
+    count = 0
+    while True:
+        cancelled = expire_reservations(timezone.now(), batch_size)
+        count += cancelled
+        if cancelled < batch_size:
+            break
+    return f'Cancelled {count} expired reservations'
+
 @shared_task
 def send_payment_confirmation(reservation_id):
     """
@@ -98,16 +247,56 @@ def send_payment_confirmation(reservation_id):
     return f'Sent payment confirmation for reservation {reservation_id}'
 
 @shared_task
-def notify_admin_of_new_reservation(reservation_id):
+def render_ticket_artifact(ticket_id):
     """
-    Notify admin of a new reservation.
+    Render a ticket's printable artifact unless it is already on disk.
     """
-    reservation = Reservation.objects.get(id=reservation_id)
-    send_mail(
-        subject='New Reservation Notification',
-        message=f'A new reservation has been made by {reservation.user.username} for the show "{reservation.show.title}" on {reservation.show.date} at {reservation.show.time}. Seat number: {reservation.seat.seat_number}.',
-        from_email='noreply@theater.com',
-        recipient_list=['admin@theater.com'],
-    )
-    return f'Notified admin of new reservation {reservation_id}'
+    ticket = load_ticket(pk=ticket_id)
+    if ticket is None:  # Voided before the worker got to it.
+        return f'Ticket {ticket_id} no longer exists'
+    return store_artifact(ticket)
 
+@shared_task
+def send_reservation_digest():
+    """
+    Email the admin one digest of the reservations made since the last one.
+
+    Every reservation request leaves a ReservationDigestEvent in its own
+    transaction, so a request that commits late is simply picked up by the
+    next digest instead of being skipped. Pending events are claimed with
+    SKIP LOCKED, summed per show with one aggregate query and deleted once
+    the mail is sent.
+    """
+    get_kv().set(RESERVATION_DIGEST_PENDING_KEY, 0)
+    with transaction.atomic():
+        event_ids = list(
+            ReservationDigestEvent.objects.select_for_update(skip_locked=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:RESERVATION_DIGEST_EVENT_LIMIT]
+        )
+        if not event_ids:
+            return 'No new reservations'
+        shows = list(
+            ReservationDigestEvent.objects.filter(pk__in=event_ids)
+            .values('show', 'show__title', 'show__theater__name', 'show__date', 'show__time')
+            .annotate(total=Sum('reservations'))
+            .order_by('show__date', 'show__time', 'show__title')
+        )
+
+        total = sum(show['total'] for show in shows)
+        lines = [f'{total} new reservations since the last digest:', '']
+        lines += [
+            f'{show["show__title"]} at {show["show__theater__name"]} on {show["show__date"]} at {show["show__time"]}: '
+            f'{show["total"]}'
+            for show in shows
+        ]
+        # Sent before the events are deleted, so a failed send is retried
+        # by the next digest instead of being lost.
+        send_mail(
+            subject=f'New Reservations Digest ({total})',
+            message='\n'.join(lines),
+            from_email='noreply@theater.com',
+            recipient_list=['admin@theater.com'],
+        )
+        ReservationDigestEvent.objects.filter(pk__in=event_ids).delete()
+    return f'Sent digest of {total} new reservations'
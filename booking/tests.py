@@ -1,3 +1,160 @@
-from django.test import TestCase
+import datetime
+import re
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .kv import MemoryStore
+from .models import Reservation, Seat, Show, ShowOccupancy, Theater
+from .services import cancel_reservations
+from .views import theater_listing
+
+
+class TheaterDateFilterQueryPlanTests(TestCase):
+    """
+    The date and location filters of the theater listing must stay index
+    lookups once the show table is large.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        theaters = Theater.objects.bulk_create(
+            [Theater(name=f'Theater {i}', location=f'City {i % 10}') for i in range(100)]
+        )
+        first_day = datetime.date(2030, 1, 1)
+        Show.objects.bulk_create(
+            [
+                Show(
+                    theater=theaters[i % 100],
+                    title=f'Show {i}',
+                    description='',
+                    date=first_day + datetime.timedelta(days=i // 100 % 365),
+                    time=datetime.time(i // 36500),
+                )
+                for i in range(100_000)
+            ],
+            batch_size=5000,
+        )
+        cls.first_day = first_day
+
+    def assertNoSequentialScan(self, queryset, *tables):
+        plan = queryset.explain()
+        for table in tables:
+            if connection.vendor == 'postgresql':
+                self.assertNotIn(f'Seq Scan on {table}', plan, plan)
+            else:
+                # SQLite reports a full table scan as "SCAN <table or alias>"
+                # without a "USING ... INDEX" clause.
+                full_scans = [
+                    line for line in plan.splitlines()
+                    if re.search(rf'\bSCAN {table}\b', line) and 'INDEX' not in line
+                ]
+                self.assertEqual(full_scans, [], plan)
+
+    def test_date_filter_uses_show_index(self):
+        theaters, _ = theater_listing({'date': self.first_day.isoformat()})
+        self.assertEqual(theaters.count(), 100)
+        # SQLite aliases the subquery table as U0.
+        self.assertNoSequentialScan(theaters, 'booking_show', 'U0')
+
+    def test_location_filter_uses_theater_index(self):
+        theaters, _ = theater_listing({'location': 'City 1'})
+        self.assertEqual(theaters.count(), 10)
+        self.assertNoSequentialScan(theaters, 'booking_theater')
+
+    def test_malformed_date_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('viewer'))
+        response = client.get('/api/theaters/', {'date': '2030-13-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'message': 'date must be in YYYY-MM-DD format'})
+
+
+@override_settings(BOOKING_KV_BACKEND='memory', BOOKING_PUBSUB_BACKEND='memory')
+class ReservationFlowTests(TestCase):
+    """
+    Reserving, holding, paying and cancelling through the API keep seats
+    exclusive and the show's occupancy counters in step.
+    """
+
+    def setUp(self):
+        # Bitmaps and holds live in a fresh in-process store per test.
+        patcher = mock.patch('booking.kv._client', MemoryStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        theater = Theater.objects.create(name='Globe', location='London')
+        self.seats = Seat.objects.bulk_create(
+            [Seat(theater=theater, seat_number=f'A{number}') for number in range(1, 5)]
+        )
+        self.show = Show.objects.create(
+            theater=theater, title='Hamlet', description='', date=datetime.date(2030, 1, 1), time=datetime.time(20),
+        )
+        self.alice = APIClient()
+        self.alice.force_authenticate(User.objects.create_user('alice'))
+        self.bob = APIClient()
+        self.bob.force_authenticate(User.objects.create_user('bob'))
+
+    def reserve(self, client, *seats):
+        with self.captureOnCommitCallbacks(execute=True):
+            if len(seats) == 1:
+                return client.post('/api/reservations/add', {'show': self.show.id, 'seat': seats[0].id})
+            return client.post(
+                '/api/reservations/batch', {'show': self.show.id, 'seats': [seat.id for seat in seats]}, format='json',
+            )
+
+    def assertSeatTaken(self, response, *seats):
+        self.assertEqual(response.status_code, 409, response.data)
+        self.assertEqual(response.data['code'], 'seat_taken')
+        self.assertEqual(response.data['seats'], [seat.id for seat in seats])
+
+    def assertOccupancy(self, reserved, paid):
+        occupancy = ShowOccupancy.objects.get(show=self.show)
+        self.assertEqual((occupancy.reserved, occupancy.paid), (reserved, paid))
+
+    def test_reserved_seat_is_taken(self):
+        self.assertEqual(self.reserve(self.alice, self.seats[0]).status_code, 201)
+        self.assertSeatTaken(self.reserve(self.bob, self.seats[0]), self.seats[0])
+
+    def test_held_seat_is_taken_for_everyone_but_the_holder(self):
+        response = self.alice.post('/api/holds/', {'show': self.show.id, 'seat': self.seats[0].id})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertSeatTaken(self.reserve(self.bob, self.seats[0]), self.seats[0])
+        self.assertEqual(self.reserve(self.alice, self.seats[0]).status_code, 201)
+
+    def test_batch_is_all_or_nothing(self):
+        self.reserve(self.bob, self.seats[1])
+        self.assertSeatTaken(self.reserve(self.alice, *self.seats[:3]), self.seats[1])
+        self.assertFalse(Reservation.objects.filter(user__username='alice').exists())
+
+        response = self.reserve(self.alice, self.seats[0], self.seats[2])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([row['seat'] for row in response.data], [self.seats[0].id, self.seats[2].id])
+
+    def test_cancelled_reservation_is_reused(self):
+        first = self.reserve(self.alice, self.seats[0]).data['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_reservations([first])
+
+        response = self.reserve(self.bob, self.seats[0])
+        self.assertEqual(response.status_code, 201, response.data)
+        reservation = Reservation.objects.get(show=self.show, seat=self.seats[0])
+        self.assertEqual((reservation.pk, reservation.user.username, reservation.status), (first, 'bob', 'reserved'))
+
+    def test_occupancy_follows_reserve_pay_and_cancel(self):
+        reservations = [row['id'] for row in self.reserve(self.alice, *self.seats[:3]).data]
+        self.assertOccupancy(reserved=3, paid=0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.alice.post('/api/reservations/pay', {'reservations': reservations[:1]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertOccupancy(reserved=2, paid=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_reservations(reservations[:2])
+        self.assertOccupancy(reserved=1, paid=0)
+
+        response = self.alice.get(f'/api/shows/{self.show.id}/occupancy/')
+        self.assertEqual((response.data['sold'], response.data['reserved'], response.data['free']), (0, 1, 3))
@@ -0,0 +1,155 @@
+"""
+Ticket numbers and ticket issuance.
+
+A ticket number is eight Crockford base32 symbols followed by a check
+symbol, e.g. ``HJBMQ7PMH``. The eight symbols encode a 40-bit value drawn
+from the ``TicketSequence`` counter and passed through a fixed bijective
+permutation, so numbers never collide, yet consecutive tickets do not
+look consecutive. The check symbol (the value mod 37) catches a mistyped
+symbol or two swapped neighbours when a number is read out or keyed in.
+
+Each process reserves blocks of ``TICKET_NUMBER_BLOCK_SIZE`` sequence
+values at a time and hands numbers out from memory, so issuing a ticket
+costs no database round trip for its number.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from . import outbox
+from .models import Reservation, Ticket, TicketSequence
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+CHECK_ALPHABET = ALPHABET + '*~$=U'
+SYMBOLS = 8
+BITS = 5 * SYMBOLS
+MASK = (1 << BITS) - 1
+# Odd multipliers are invertible modulo 2**40 and xor-shifts are invertible,
+# so the permutation maps every 40-bit value to a distinct one.
+MULTIPLIERS = (0x9E3779B97, 0xBF58476D1)
+# Misread letters that Crockford base32 folds onto symbols.
+ALIASES = str.maketrans({'O': '0', 'I': '1', 'L': '1'})
+
+SEQUENCE_NAME = 'ticket'
+
+
+class InvalidTicketNumber(ValueError):
+    pass
+
+
+def permute(value):
+    for multiplier in MULTIPLIERS:
+        value = (value * multiplier) & MASK
+        value ^= value >> (BITS // 2)
+    return value
+
+
+def check_symbol(value):
+    return CHECK_ALPHABET[value % 37]
+
+
+def encode(value):
+    """
+    The ticket number of sequence value ``value``.
+    """
+    if not 0 <= value <= MASK:
+        raise ValueError(f'Ticket sequence value {value} is out of range')
+    permuted = permute(value)
+    symbols = ''.join(ALPHABET[(permuted >> shift) & 31] for shift in range(BITS - 5, -1, -5))
+    return symbols + check_symbol(permuted)
+
+
+def normalize(text):
+    """
+    Canonical form of a ticket number as typed by a person: upper case, no
+    spaces or hyphens, ambiguous letters folded. Raises ``InvalidTicketNumber``
+    if the check symbol does not match.
+    """
+    text = ''.join(text.split()).replace('-', '').upper().translate(ALIASES)
+    if len(text) != SYMBOLS + 1 or any(symbol not in ALPHABET for symbol in text[:-1]):
+        raise InvalidTicketNumber(f'{text!r} is not a ticket number')
+    value = 0
+    for symbol in text[:-1]:
+        value = (value << 5) | ALPHABET.index(symbol)
+    if text[-1] != check_symbol(value):
+        raise InvalidTicketNumber(f'{text!r} has a wrong check symbol')
+    return text
+
+
+def reserve_block(size):
+    """
+    Advance the ticket sequence by ``size`` in the current transaction and
+    return the reserved values.
+    """
+    with transaction.atomic():
+        sequence, _ = TicketSequence.objects.select_for_update().get_or_create(name=SEQUENCE_NAME)
+        start = sequence.next_value
+        if start + size - 1 > MASK:
+            raise ValueError('Ticket number space is exhausted')
+        sequence.next_value = start + size
+        sequence.save(update_fields=['next_value'])
+    return range(start, start + size)
+
+
+class NumberAllocator:
+    """
+    Hands out sequence values from blocks reserved in the database. The
+    unused rest of a block is kept only once the transaction that reserved
+    it commits: a rolled-back reservation is given back to the sequence and
+    must not be handed out again from memory.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.spare = range(0)
+
+    def take(self, count):
+        with self.lock:
+            values = list(self.spare[:count])
+            self.spare = self.spare[count:]
+        missing = count - len(values)
+        if missing:
+            block = reserve_block(max(missing, settings.TICKET_NUMBER_BLOCK_SIZE))
+            values += block[:missing]
+            transaction.on_commit(lambda: self.keep(block[missing:]))
+        return values
+
+    def keep(self, values):
+        with self.lock:
+            if not self.spare:
+                self.spare = values
+
+
+allocator = NumberAllocator()
+# A forked worker must not hand out its parent's numbers.
+os.register_at_fork(after_in_child=allocator.reset)
+
+
+def issue_tickets(reservation_ids):
+    """
+    Create the tickets of every paid reservation in ``reservation_ids`` that
+    has none yet with one ``bulk_create``, and return the new tickets. Their
+    printable artifacts are rendered afterwards by a Celery task.
+    """
+    with transaction.atomic():
+        locked = list(
+            Reservation.objects.select_for_update()
+            .filter(pk__in=reservation_ids, status='paid')
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        ticketed = set(Ticket.objects.filter(reservation_id__in=locked).values_list('reservation_id', flat=True))
+        pending = [pk for pk in locked if pk not in ticketed]
+        if not pending:
+            return []
+        numbers = allocator.take(len(pending))
+        tickets = Ticket.objects.bulk_create([
+            Ticket(reservation_id=pk, ticket_number=encode(value)) for pk, value in zip(pending, numbers)
+        ])
+        outbox.enqueue([outbox.event('booking.tasks.render_ticket_artifact', ticket.pk) for ticket in tickets])
+    return tickets
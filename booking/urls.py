@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     HomeView, SignupView, LoginView, LogoutView,
     TheaterCreateAPIView, TheaterListAPIView, ShowListAPIView,ShowCreateAPIView, SeatListCreateAPIView,
-    ReservationCreateAPIView, BookTicketsAPIView, ReservationListAPIView
+    ReservationCreateAPIView, ReservationBatchCreateAPIView, ReservationPayAPIView, BookTicketsAPIView, TicketArtifactAPIView, ReservationListAPIView,
+    SeatPricingListAPIView, ShowAvailabilityAPIView, ShowOccupancyAPIView, StreamTicketAPIView, BestAvailableAPIView, ShowQuoteAPIView, HoldCreateAPIView, HoldReleaseAPIView, HoldConfirmAPIView
 )
 
 # Router for ViewSets
@@ -21,8 +22,20 @@ urlpatterns = [
     path('api/theaters/', TheaterListAPIView.as_view(), name='theater-list'),
     path('api/shows/add', ShowCreateAPIView.as_view(), name='show-create'),
     path('api/shows/', ShowListAPIView.as_view(), name='show-list'),
+    path('api/shows/<int:show_id>/availability/', ShowAvailabilityAPIView.as_view(), name='show-availability'),
+    path('api/shows/<int:show_id>/occupancy/', ShowOccupancyAPIView.as_view(), name='show-occupancy'),
+    path('api/shows/<int:show_id>/stream-ticket', StreamTicketAPIView.as_view(), name='show-stream-ticket'),
+    path('api/shows/<int:show_id>/best-available/', BestAvailableAPIView.as_view(), name='show-best-available'),
+    path('api/shows/<int:show_id>/quote', ShowQuoteAPIView.as_view(), name='show-quote'),
     path('api/seats/', SeatListCreateAPIView.as_view(), name='seat-list-create'),
+    path('api/seats/pricing/', SeatPricingListAPIView.as_view(), name='seat-pricing-list'),
     path('api/reservations/', ReservationListAPIView.as_view(), name='reservation-list'),
     path('api/reservations/add', ReservationCreateAPIView.as_view(), name='reservation-create'),
+    path('api/reservations/batch', ReservationBatchCreateAPIView.as_view(), name='reservation-batch-create'),
+    path('api/reservations/pay', ReservationPayAPIView.as_view(), name='reservation-pay'),
+    path('api/holds/', HoldCreateAPIView.as_view(), name='hold-create'),
+    path('api/holds/release', HoldReleaseAPIView.as_view(), name='hold-release'),
+    path('api/holds/confirm', HoldConfirmAPIView.as_view(), name='hold-confirm'),
     path('api/tickets/', BookTicketsAPIView.as_view(), name='ticket-list-create'),
+    path('api/tickets/<str:ticket_number>/artifact', TicketArtifactAPIView.as_view(), name='ticket-artifact'),
 ]
@@ -1,17 +1,46 @@
-from django.shortcuts import render, redirect
+import os
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.exceptions import BadRequest
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from django.utils.http import content_disposition_header, http_date
 from django.views.generic import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.permissions import IsAdminUser
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Theater, Show, Seat, Reservation
+from .models import Theater, Show, Seat, SeatPricing, Reservation, ShowOccupancy, Ticket
+from .availability import get_availability, theater_id_for_show
+from . import holds, outbox
+from .best_available import find_best_blocks
+from .layout import get_layout
+from .cache import VersionedRead
+from .pagination import KeysetPagination
+from .renderers import NDJSONRenderer, stream_ndjson, wants_ndjson
+from .exceptions import HoldExpired, SeatNotPriced, SeatTaken
+from .pricing import get_price_map
+from .push import STREAM_TICKET_TTL, issue_stream_ticket
+from .services import confirm_hold, count_occupancy, pay_reservations, reserve_seat, reserve_seats
+from .tickets import InvalidTicketNumber, issue_tickets, normalize as normalize_ticket_number
+from .artifacts import (
+    CONTENT_TYPE as ARTIFACT_CONTENT_TYPE, RENDER_QUEUED_TIMEOUT, artifact_key, artifact_name, artifact_path, load_ticket,
+)
 from .serializers import (
-    TheaterSerializer, ShowSerializer, SeatSerializer,
-    ReservationSerializer
+    TheaterSerializer, ShowSerializer, SeatSerializer, SeatPricingSerializer,
+    TheaterListSerializer, ShowListSerializer, SeatListSerializer,
+    ReservationSerializer, ReservationCreateSerializer, ReservationBatchCreateSerializer, ReservationPaySerializer,
+    QuoteSerializer, TicketSerializer, TicketIssueSerializer,
 )
 
 class HomeView(View):
@@ -67,25 +96,101 @@ class SearchTheatersView(View):
 @login_required
 def block_seats(request, show_id):
     if request.method == 'POST':
-        show = Show.objects.get(id=show_id)
-        seat_number = request.POST.get('seat_number')
-        reservation_id = f"reserve_{show_id}_{request.user.id}"
-        Reservation.objects.create(user=request.user, show=show, seat_number=seat_number, reservation_id=reservation_id)
-        return redirect('book_tickets', reservation_id=reservation_id)
+        show = get_object_or_404(Show, pk=show_id)
+        seat = Seat.objects.filter(theater_id=show.theater_id, seat_number=request.POST.get('seat_number')).first()
+        if seat is None:
+            return render(request, 'booking/block_seats.html', {'show_id': show_id, 'error': 'Seat not found'})
+        try:
+            hold = holds.place_hold(show, seat, request.user)
+        except SeatTaken:
+            return render(request, 'booking/block_seats.html', {'show_id': show_id, 'error': 'Seat already taken'})
+        return render(request, 'booking/block_seats.html', {'show_id': show_id, 'hold': hold.to_dict()})
     return render(request, 'booking/block_seats.html', {'show_id': show_id})
 
 @login_required
 def book_tickets(request, reservation_id):
-    if request.method == 'POST':
-        reservation = Reservation.objects.get(reservation_id=reservation_id, user=request.user)
-        ticket_id = f"ticket_{reservation.id}"
-        reservation.ticket_id = ticket_id
-        reservation.save()
+    reservation = get_object_or_404(Reservation, pk=reservation_id, user=request.user)
+    if request.method == 'POST' and reservation.status == 'paid':
+        issue_tickets([reservation.id])
+        ticket_id = Ticket.objects.get(reservation=reservation).ticket_number
         return render(request, 'booking/book_tickets.html', {'ticket_id': ticket_id})
     return render(request, 'booking/book_tickets.html', {'reservation_id': reservation_id})
 
 # API views
 
+LIST_RENDERER_CLASSES = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
+
+# Query parameters each listing filters on; together with the pagination
+# parameters they are all that names a cached page.
+THEATER_FILTERS = ('date', 'location')
+SHOW_FILTERS = ('theater_id',)
+SEAT_FILTERS = ('show_id',)
+SEAT_PRICING_FILTERS = ('theater_id',)
+
+def list_params(request, filters, format):
+    """
+    The query parameters a listing page depends on, in a fixed order, so
+    unused or reordered parameters share one cache entry and ETag.
+    """
+    return (
+        tuple((name, request.GET.get(name)) for name in filters),
+        request.GET.get(KeysetPagination.cursor_query_param),
+        KeysetPagination().get_page_size(request),
+        format,
+    )
+
+def list_response(request, queryset, serializer_class, dependencies, filters=(), transform=None, empty_message=None):
+    """
+    Serve a catalog listing as keyset-paginated JSON, or as an NDJSON stream
+    of every row when the client asks for ``application/x-ndjson``.
+
+    Pages are read through the catalog cache, keyed on ``dependencies``
+    (``(namespace, scope)`` version pairs), and carry a weak ETag and,
+    unless they depend on seat availability, a Last-Modified derived from
+    the same versions; a matching conditional
+    GET gets a 304 before any query or serialization runs. Only the
+    ``filters`` query parameters and the pagination ones name the page.
+    ``transform`` runs on each row after the cache read.
+    """
+    if wants_ndjson(request):
+        return stream_ndjson(queryset, serializer_class, transform=transform)
+
+    read = VersionedRead(dependencies, list_params(request, filters, request.accepted_renderer.format))
+    not_modified = get_conditional_response(request, etag=read.etag, last_modified=read.last_modified)
+    if not_modified is not None:
+        return set_validators(not_modified, read)
+
+    def paginate():
+        if hasattr(serializer_class, 'prepare_queryset'):
+            paginator = KeysetPagination(value_getter=serializer_class.cursor_value)
+            page = paginator.paginate_queryset(serializer_class.prepare_queryset(queryset), request)
+        else:
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(queryset, request)
+        return {'next': paginator.get_next_cursor(), 'results': serializer_class(page, many=True).data}
+
+    page = read.get_or_set(paginate)
+    if empty_message and not page['results'] and 'cursor' not in request.query_params:
+        return Response({'message': empty_message}, status=status.HTTP_404_NOT_FOUND)
+    if transform is not None:
+        for row in page['results']:
+            transform(row)
+    # The link is built per request: the cached page only holds the cursor.
+    payload = {'next': KeysetPagination.link_to(request, page['next']), 'results': page['results']}
+    return set_validators(Response(payload, status=status.HTTP_200_OK), read)
+
+def set_validators(response, read):
+    response['ETag'] = read.etag
+    if read.last_modified is not None:
+        response['Last-Modified'] = http_date(read.last_modified)
+    return response
+
+def parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
 class TheaterCreateAPIView(APIView):
     permission_classes = [IsAdminUser]
 
@@ -96,34 +201,61 @@ class TheaterCreateAPIView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+def theater_listing(params):
+    """
+    The queryset and cache dependencies of a theater listing filtered by
+    ``params``; raises ``BadRequest`` for an invalid filter.
+    """
+    location = params.get('location')
+    if location:
+        theaters = Theater.objects.filter(location=location)
+    else:
+        theaters = Theater.objects.all()
+
+    date = params.get('date')
+    if not date:
+        return theaters, [('theater', None)]
+    try:
+        date = parse_date(date)
+    except ValueError:
+        date = None
+    if date is None:
+        raise BadRequest('date must be in YYYY-MM-DD format')
+    theaters = theaters.filter(Exists(Show.objects.filter(theater=OuterRef('pk'), date=date)))
+    return theaters, [('theater', None), ('show', None)]
+
+def show_listing(params):
+    theater_id = params.get('theater_id')
+    if not theater_id:
+        return Show.objects.all(), [('show', None)]
+    theater_id = parse_id(theater_id)
+    if theater_id is None:
+        raise BadRequest('theater_id must be an integer')
+    return Show.objects.filter(theater_id=theater_id), [('show', theater_id or None)]
+
 class TheaterListAPIView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = LIST_RENDERER_CLASSES
 
     def get(self, request):
-        location = request.query_params.get('location')
-        if location:
-            theaters = Theater.objects.filter(location=location)
-        else:
-            theaters = Theater.objects.all()
-
-        if not theaters:
-            return Response({'message': 'No theaters found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        serializer = TheaterSerializer(theaters, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            theaters, dependencies = theater_listing(request.query_params)
+        except BadRequest as error:
+            return Response({'message': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return list_response(request, theaters, TheaterListSerializer, dependencies, filters=THEATER_FILTERS,
+                             empty_message='No theaters found')
 
 class ShowListAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = LIST_RENDERER_CLASSES
 
     def get(self, request):
-        theater_id = request.query_params.get('theater_id')
-        if theater_id:
-            shows = Show.objects.filter(theater_id=theater_id)
-        else:
-            shows = Show.objects.all()
-        serializer = ShowSerializer(shows, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            shows, dependencies = show_listing(request.query_params)
+        except BadRequest as error:
+            return Response({'message': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return list_response(request, shows, ShowListSerializer, dependencies, filters=SHOW_FILTERS)
 
 class ShowCreateAPIView(APIView):
     permission_classes = [IsAdminUser]
@@ -137,15 +269,29 @@ class ShowCreateAPIView(APIView):
 
 class SeatListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = LIST_RENDERER_CLASSES
 
     def get(self, request):
         show_id = request.query_params.get('show_id')
         if show_id:
-            seats = Seat.objects.filter(show_id=show_id)
-        else:
-            seats = Seat.objects.all()
-        serializer = SeatSerializer(seats, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+            show_id = parse_id(show_id)
+            try:
+                theater_id = theater_id_for_show(show_id)
+            except Show.DoesNotExist:
+                return Response({'message': 'Show not found'}, status=status.HTTP_404_NOT_FOUND)
+            seats = Seat.objects.filter(theater_id=theater_id)
+            availability = []
+
+            def mark_reserved(seat):
+                # Fetched on first use, so a 304 never reads the bitmap.
+                if not availability:
+                    availability.append(get_availability(show_id))
+                seat['is_reserved'] = availability[0].is_taken(seat['id'])
+
+            dependencies = [('seat', theater_id), ('availability', show_id)]
+            return list_response(request, seats, SeatListSerializer, dependencies, filters=SEAT_FILTERS,
+                                 transform=mark_reserved)
+        return list_response(request, Seat.objects.all(), SeatListSerializer, [('seat', None)])
 
     def post(self, request):
         serializer = SeatSerializer(data=request.data)
@@ -154,6 +300,111 @@ class SeatListCreateAPIView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class SeatPricingListAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = LIST_RENDERER_CLASSES
+
+    def get(self, request):
+        pricing = SeatPricing.objects.select_related('seat')
+        theater_id = request.query_params.get('theater_id')
+        if theater_id:
+            theater_id = parse_id(theater_id)
+            if theater_id is None:
+                return Response({'message': 'theater_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            pricing = pricing.filter(seat__theater_id=theater_id)
+        dependencies = [('seatpricing', theater_id or None), ('seat', theater_id or None)]
+        return list_response(request, pricing, SeatPricingSerializer, dependencies, filters=SEAT_PRICING_FILTERS)
+
+class ShowAvailabilityAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, show_id):
+        if not Show.objects.filter(id=show_id).exists():
+            return Response({'message': 'Show not found'}, status=status.HTTP_404_NOT_FOUND)
+        data = get_availability(show_id).to_dict()
+        held = set(holds.held_seat_ids(show_id))
+        data['held'] = sorted(held)
+        data['free'] = [seat_id for seat_id in data['free'] if seat_id not in held]
+        return Response(data, status=status.HTTP_200_OK)
+
+class ShowOccupancyAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, show_id):
+        try:
+            theater_id = theater_id_for_show(show_id)
+        except Show.DoesNotExist:
+            return Response({'message': 'Show not found'}, status=status.HTTP_404_NOT_FOUND)
+        occupancy = ShowOccupancy.objects.filter(show_id=show_id).values('reserved', 'paid').first()
+        if occupancy is None:
+            # No counter row yet (e.g. a bulk-created show): count instead.
+            occupancy = count_occupancy(show_id)
+        held = len(holds.held_seat_ids(show_id))
+        capacity = len(get_layout(theater_id))
+        return Response({
+            'show': show_id,
+            'capacity': capacity,
+            'sold': occupancy['paid'],
+            'reserved': occupancy['reserved'],
+            'held': held,
+            'free': max(capacity - occupancy['paid'] - occupancy['reserved'] - held, 0),
+        }, status=status.HTTP_200_OK)
+
+class StreamTicketAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, show_id):
+        if not Show.objects.filter(id=show_id).exists():
+            return Response({'message': 'Show not found'}, status=status.HTTP_404_NOT_FOUND)
+        ticket = issue_stream_ticket(request.user.id, show_id)
+        return Response({'ticket': ticket, 'expires_in': STREAM_TICKET_TTL}, status=status.HTTP_201_CREATED)
+
+class BestAvailableAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, show_id):
+        try:
+            count = int(request.query_params.get('count', 1))
+            limit = int(request.query_params.get('limit', 1))
+        except ValueError:
+            return Response({'message': 'count and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= count <= 20 or not 1 <= limit <= 10:
+            return Response({'message': 'count must be 1-20 and limit 1-10'}, status=status.HTTP_400_BAD_REQUEST)
+        if not Show.objects.filter(id=show_id).exists():
+            return Response({'message': 'Show not found'}, status=status.HTTP_404_NOT_FOUND)
+        blocks = find_best_blocks(show_id, count, limit)
+        if not blocks:
+            return Response({'message': f'No {count} adjacent seats available'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'show': show_id, 'count': count, 'blocks': blocks}, status=status.HTTP_200_OK)
+
+class ShowQuoteAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, show_id):
+        serializer = QuoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            price_map = get_price_map(show_id)
+        except Show.DoesNotExist:
+            return Response({'message': 'Show not found'}, status=status.HTTP_404_NOT_FOUND)
+        seat_ids = serializer.validated_data['seats']
+        unknown = price_map.unknown_seats(seat_ids)
+        if unknown:
+            return Response(
+                {'message': f'Seats not found in the theater of this show: {", ".join(map(str, unknown))}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            prices, total = price_map.quote(seat_ids)
+        except SeatNotPriced as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'show': show_id,
+            'seats': [{'seat': seat_id, 'price': str(price)} for seat_id, price in prices.items()],
+            'total': str(total),
+        }, status=status.HTTP_200_OK)
+
 class ReservationListAPIView(APIView):
     permission_classes = [IsAdminUser]
 
@@ -166,19 +417,171 @@ class ReservationCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        serializer = ReservationSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ReservationCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            reservation = reserve_seat(
+                request.user, serializer.validated_data['show'], serializer.validated_data['seat']
+            )
+        except SeatTaken as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_409_CONFLICT)
+        return Response(ReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
+
+class ReservationBatchCreateAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = ReservationBatchCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            reservations = reserve_seats(
+                request.user, serializer.validated_data['show'], serializer.validated_data['seats']
+            )
+        except SeatTaken as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_409_CONFLICT)
+        return Response(ReservationSerializer(reservations, many=True).data, status=status.HTTP_201_CREATED)
+
+class ReservationPayAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = ReservationPaySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        reservation_ids = set(serializer.validated_data['reservations'])
+        with transaction.atomic():
+            # Locked, so the expiry sweep (SKIP LOCKED) cannot cancel them mid-payment.
+            statuses = dict(
+                Reservation.objects.select_for_update()
+                .filter(pk__in=reservation_ids, user=request.user)
+                .values_list('pk', 'status')
+            )
+            missing = sorted(reservation_ids - statuses.keys())
+            if missing:
+                return Response({'message': 'Reservation not found', 'reservations': missing},
+                                status=status.HTTP_404_NOT_FOUND)
+            cancelled = sorted(pk for pk, reservation_status in statuses.items() if reservation_status == 'cancelled')
+            if cancelled:
+                return Response({'message': 'Reservations were cancelled or expired', 'reservations': cancelled},
+                                status=status.HTTP_409_CONFLICT)
+            pay_reservations(reservation_ids)
+        reservations = Reservation.objects.filter(pk__in=reservation_ids).order_by('pk')
+        return Response(ReservationSerializer(reservations, many=True).data, status=status.HTTP_200_OK)
+
+class HoldCreateAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = ReservationCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            hold = holds.place_hold(
+                serializer.validated_data['show'], serializer.validated_data['seat'], request.user
+            )
+        except SeatTaken as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_409_CONFLICT)
+        return Response(hold.to_dict(), status=status.HTTP_201_CREATED)
+
+class HoldReleaseAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = ReservationCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        released = holds.release_hold(
+            serializer.validated_data['show'].id, serializer.validated_data['seat'].id, request.user.id
+        )
+        if not released:
+            return Response({'message': 'No active hold on this seat'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class HoldConfirmAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = ReservationCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            reservation = confirm_hold(
+                serializer.validated_data['show'], serializer.validated_data['seat'], request.user
+            )
+        except (HoldExpired, SeatTaken) as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_409_CONFLICT)
+        return Response(ReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
 
 class BookTicketsAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        reservation_id = request.data.get('reservation_id')
-        reservation = Reservation.objects.get(reservation_id=reservation_id, user=request.user)
-        ticket_id = f"ticket_{reservation.id}"
-        reservation.ticket_id = ticket_id
-        reservation.save()
-        return Response({'ticket_id': ticket_id}, status=status.HTTP_200_OK)
+        serializer = TicketIssueSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        reservation_ids = set(serializer.validated_data['reservations'])
+        statuses = dict(
+            Reservation.objects.filter(pk__in=reservation_ids, user=request.user).values_list('pk', 'status')
+        )
+        missing = sorted(reservation_ids - statuses.keys())
+        if missing:
+            return Response({'message': 'Reservation not found', 'reservations': missing},
+                            status=status.HTTP_404_NOT_FOUND)
+        unpaid = sorted(pk for pk, reservation_status in statuses.items() if reservation_status != 'paid')
+        if unpaid:
+            return Response({'message': 'Only paid reservations can be ticketed', 'reservations': unpaid},
+                            status=status.HTTP_409_CONFLICT)
+        # Paying issues tickets already; this covers reservations paid before that.
+        issue_tickets(reservation_ids)
+        tickets = Ticket.objects.filter(reservation_id__in=reservation_ids).order_by('reservation_id')
+        return Response(TicketSerializer(tickets, many=True).data, status=status.HTTP_200_OK)
+
+class TicketArtifactAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, ticket_number):
+        try:
+            ticket_number = normalize_ticket_number(ticket_number)
+        except InvalidTicketNumber:
+            return Response({'message': 'Ticket not found'}, status=status.HTTP_404_NOT_FOUND)
+        ticket = load_ticket(ticket_number=ticket_number)
+        if ticket is None or (ticket['reservation__user_id'] != request.user.id and not request.user.is_staff):
+            return Response({'message': 'Ticket not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # The artifact name is its content address, so it doubles as the ETag.
+        key = artifact_key(ticket)
+        etag = f'"{key}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        path = artifact_path(ticket)
+        if not os.path.exists(path):
+            # Clients poll every Retry-After seconds; queue one render per
+            # artifact, not one per poll, through the outbox so a broker
+            # outage delays the render instead of failing the request.
+            if cache.add(f'ticket-artifact:render:{key}', True, RENDER_QUEUED_TIMEOUT):
+                with transaction.atomic():
+                    outbox.enqueue([outbox.event('booking.tasks.render_ticket_artifact', ticket['pk'])])
+            response = Response({'message': 'Your ticket is being prepared, try again shortly'},
+                                status=status.HTTP_202_ACCEPTED)
+            response['Retry-After'] = '2'
+            return response
+
+        filename = f'ticket-{ticket_number}.svg'
+        header = settings.TICKET_ARTIFACT_SENDFILE_HEADER
+        if header.lower() == 'x-accel-redirect':
+            response = HttpResponse(content_type=ARTIFACT_CONTENT_TYPE)
+            response[header] = settings.TICKET_ARTIFACT_INTERNAL_URL + artifact_name(ticket).replace(os.sep, '/')
+        elif header:
+            response = HttpResponse(content_type=ARTIFACT_CONTENT_TYPE)
+            response[header] = path
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=ARTIFACT_CONTENT_TYPE)
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        response['ETag'] = etag
+        # Revalidate every time: a reschedule or rename moves the ticket to a
+        # new artifact and ETag.
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,34 @@
+"""
+ASGI config for theatre_booking_system project.
+
+It exposes the ASGI callable as a module-level variable named ``application``:
+the Django project plus the real-time seat map endpoints of booking.push,
+which hold long-lived connections and so are not served by the WSGI app.
+Requests are resolved against theatre_booking_system.asgi_urls, which serves
+the catalog listings with async views.
+Run it with any ASGI server, e.g. ``uvicorn theatre_booking_system.asgi:application``.
+"""
+
+import os
+
+import django
+from django.core.handlers.asgi import ASGIHandler, ASGIRequest
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'theatre_booking_system.settings')
+
+django.setup(set_prefix=False)
+
+
+class AsyncURLConfRequest(ASGIRequest):
+    urlconf = 'theatre_booking_system.asgi_urls'
+
+
+class AsyncURLConfHandler(ASGIHandler):
+    request_class = AsyncURLConfRequest
+
+
+django_application = AsyncURLConfHandler()
+
+from booking.push import router  # noqa: E402  (needs the app registry loaded above)
+
+application = router(django_application)
@@ -0,0 +1,19 @@
+"""
+URL configuration of the ASGI application: the async catalog listings of
+booking.async_views, then everything in theatre_booking_system.urls.
+"""
+from django.urls import path
+
+from booking import async_views
+from . import urls
+
+urlpatterns = [
+    path('api/theaters/', async_views.theater_list, name='theater-list'),
+    path('api/shows/', async_views.show_list, name='show-list'),
+    path('api/seats/', async_views.seat_list, name='seat-list-create'),
+] + urls.urlpatterns
+
+handler400 = getattr(urls, 'handler400', None)
+handler403 = getattr(urls, 'handler403', None)
+handler404 = getattr(urls, 'handler404', None)
+handler500 = getattr(urls, 'handler500', None)
@@ -29,7 +29,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = os.getenv('SECRET_KEY', get_random_secret_key())
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv("DEBUG", "True") == "True"
 
 ALLOWED_HOSTS = []
 
@@ -45,7 +45,6 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'debug_toolbar',
     'drf_yasg',
     'booking',
 ]
@@ -58,10 +57,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
-
 ]
 
+# The toolbar middleware is sync-only: under ASGI it would run every request,
+# async views included, on a thread. Leave it out unless debugging.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'theatre_booking_system.urls'
 
 TEMPLATES = [
@@ -81,6 +84,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'theatre_booking_system.wsgi.application'
+ASGI_APPLICATION = 'theatre_booking_system.asgi.application'
 
 TESTING = True
 
@@ -110,6 +114,30 @@ else:
         }
     }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+if os.getenv("CACHE_HOST"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://{}:{}/{}".format(
+                os.getenv("CACHE_HOST"), os.getenv("CACHE_PORT") or 6379, os.getenv("CACHE_DB") or 0
+            ),
+            "OPTIONS": {"password": os.getenv("CACHE_PASSWORD") or None},
+            "KEY_PREFIX": os.getenv("DJANGO_CACHE_PREFIX", ""),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Catalog listings are cached under versioned keys, so entries can live long
+CATALOG_CACHE_TIMEOUT = 60 * int(os.getenv("CACHE_MINUTES") or 10080)
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -132,6 +160,9 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'booking.pagination.KeysetPagination',
+    # Rows per page of the keyset-paginated list endpoints (?page_size= overrides, up to 1000)
+    'PAGE_SIZE': 100,
 }
 
 # JWT settings
@@ -163,6 +194,15 @@ STATIC_URL = '/static/'
 # Redis URL
 REDIS_DB_URL = os.environ.get("REDIS_DB_URL", "redis://localhost:6379")
 
+# Seat state store: "redis" uses REDIS_DB_URL, "memory" keeps it in-process (tests)
+BOOKING_KV_BACKEND = os.environ.get("BOOKING_KV_BACKEND", "redis")
+
+# Seat map push fan-out (booking.pubsub): "redis" reaches every process, "memory" only this one
+BOOKING_PUBSUB_BACKEND = os.environ.get("BOOKING_PUBSUB_BACKEND", BOOKING_KV_BACKEND)
+
+# Seconds a seat stays held during checkout before it is released automatically
+SEAT_HOLD_TTL = int(os.environ.get("SEAT_HOLD_TTL", 10 * 60))
+
 #CELERY
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", REDIS_DB_URL)
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", REDIS_DB_URL)
@@ -174,6 +214,39 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_ALWAYS_EAGER = os.environ.get("CELERY_ALWAYS_EAGER", False)
 
+# Users per send_show_reminder_batch subtask (each batch reuses one SMTP connection)
+REMINDER_BATCH_SIZE = int(os.environ.get("REMINDER_BATCH_SIZE", 500))
+
+# Users per transaction in deactivate_inactive_accounts (progress is checkpointed per chunk)
+DEACTIVATION_BATCH_SIZE = int(os.environ.get("DEACTIVATION_BATCH_SIZE", 1000))
+
+# New-reservation digest for the admin: sent every interval (seconds), or early
+# once this many reservations are waiting
+RESERVATION_DIGEST_INTERVAL = int(os.environ.get("RESERVATION_DIGEST_INTERVAL", 5 * 60))
+RESERVATION_DIGEST_MAX_EVENTS = int(os.environ.get("RESERVATION_DIGEST_MAX_EVENTS", 500))
+
+# Outbox events published per relay batch (manage.py relay_outbox)
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 500))
+
+# Reservations cancelled per transaction by the unpaid-reservation expiry sweep
+RESERVATION_EXPIRY_BATCH_SIZE = int(os.environ.get("RESERVATION_EXPIRY_BATCH_SIZE", 500))
+
+# Ticket numbers each process reserves from the database at a time
+TICKET_NUMBER_BLOCK_SIZE = int(os.environ.get("TICKET_NUMBER_BLOCK_SIZE", 1000))
+
+# Rendered ticket artifacts (booking.artifacts), named by ticket number and template version
+TICKET_ARTIFACT_ROOT = os.environ.get("TICKET_ARTIFACT_ROOT", os.path.join(BASE_DIR, "ticket_artifacts"))
+# Let the web server send artifact downloads: "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache, lighttpd)
+TICKET_ARTIFACT_SENDFILE_HEADER = os.environ.get("TICKET_ARTIFACT_SENDFILE_HEADER", "")
+# Internal nginx location aliased to TICKET_ARTIFACT_ROOT, for X-Accel-Redirect
+TICKET_ARTIFACT_INTERNAL_URL = os.environ.get("TICKET_ARTIFACT_INTERNAL_URL", "/internal/ticket-artifacts/")
+
+# Dynamic pricing curves, selected per show by Show.pricing_curve: (occupancy, multiplier)
+# steps applied once a seat's price zone (or the show, for seats without a zone) is that full
+PRICING_CURVES = {
+    "popular": [(0.5, "1.10"), (0.75, "1.25"), (0.9, "1.50")],
+}
+
 # Celery Beat
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 CELERY_BEAT_SCHEDULE = {
@@ -185,6 +258,14 @@ CELERY_BEAT_SCHEDULE = {
             "expires": 15.0,
         },
     },
+    "send-reservation-digest": {
+        "task": "booking.tasks.send_reservation_digest",
+        "schedule": float(RESERVATION_DIGEST_INTERVAL),
+    },
+    "expire-unpaid-reservations": {
+        "task": "booking.tasks.expire_unpaid_reservations",
+        "schedule": 60.0,
+    },
 }
 
 CACHEOPS_REDIS = {